@@ -3,21 +3,32 @@
 Simple example client to demonstrate MCP communication.
 This shows how an MCP client interacts with an MCP server.
 """
+import argparse
 import subprocess
 import json
 import sys
 
+import msgspec
+
 
 class SimpleMCPClient:
-    def __init__(self, command):
-        """Start the MCP server as a subprocess."""
+    def __init__(self, command, wire="json"):
+        """Start the MCP server as a subprocess.
+
+        Args:
+            command: Command starting the server
+            wire: "json" for newline-delimited JSON (standard MCP) or "msgpack"
+                for length-prefixed MessagePack frames (server run with --wire msgpack)
+        """
+        self.wire = wire
+        # Length-prefixed frames are read with exact-size reads, so the pipes
+        # can be unbuffered; JSON lines need buffering for readline()
         self.process = subprocess.Popen(
             command,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1
+            bufsize=0 if wire == "msgpack" else -1
         )
         self.request_id = 0
 
@@ -34,20 +45,62 @@ class SimpleMCPClient:
         print(f"\n→ Sending request:")
         print(json.dumps(request, indent=2))
 
-        # Send request
-        self.process.stdin.write(json.dumps(request) + "\n")
+        if self.wire == "msgpack":
+            response = self._exchange_msgpack(request)
+        else:
+            response = self._exchange_json(request)
+        if response is None:
+            return None
+
+        print(f"\n← Received response:")
+        print(json.dumps(response, indent=2))
+
+        return response
+
+    def _exchange_json(self, request):
+        """Send a newline-delimited JSON request and read the response line."""
+        self.process.stdin.write(msgspec.json.encode(request) + b"\n")
         self.process.stdin.flush()
 
-        # Read response
         response_line = self.process.stdout.readline()
         if not response_line:
             return None
 
-        response = json.loads(response_line)
-        print(f"\n← Received response:")
-        print(json.dumps(response, indent=2))
+        return msgspec.json.decode(response_line)
 
-        return response
+    def _exchange_msgpack(self, request):
+        """Send a length-prefixed MessagePack request and read the response frame."""
+        self._write_frame(msgspec.msgpack.encode(request))
+
+        payload = self._read_frame()
+        if payload is None:
+            return None
+
+        return msgspec.msgpack.decode(payload)
+
+    def _write_frame(self, payload):
+        """Write a payload prefixed with its 4-byte big-endian length."""
+        frame = memoryview(len(payload).to_bytes(4, "big") + payload)
+        while frame:
+            frame = frame[self.process.stdin.write(frame):]
+
+    def _read_frame(self):
+        """Read one length-prefixed payload, or None if the server closed stdout."""
+        header = self._read_exact(4)
+        if header is None:
+            return None
+
+        return self._read_exact(int.from_bytes(header, "big"))
+
+    def _read_exact(self, size):
+        """Read exactly size bytes from the unbuffered stdout pipe."""
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.process.stdout.read(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return bytes(data)
 
     def close(self):
         """Close the connection to the server."""
@@ -58,12 +111,21 @@ class SimpleMCPClient:
 
 
 def main():
+    parser = argparse.ArgumentParser(description="MCP Client Demo - NBP Server")
+    parser.add_argument(
+        "--wire",
+        choices=["json", "msgpack"],
+        default="json",
+        help="Wire format used to talk to the server"
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("MCP Client Demo - NBP Server")
     print("=" * 60)
 
     # Start the server
-    client = SimpleMCPClient(["python", "main.py"])
+    client = SimpleMCPClient(["python", "main.py", "--wire", args.wire], wire=args.wire)
 
     try:
         # 1. Initialize the connection
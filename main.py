@@ -10,6 +10,12 @@ def main():
         default="stdio",
         help="Transport type: stdio for CLI or streamable-http for HTTP"
     )
+    parser.add_argument(
+        "--wire",
+        choices=["json", "msgpack"],
+        default="json",
+        help="Wire format for stdio transport: json (standard MCP) or msgpack (length-prefixed frames)"
+    )
     parser.add_argument(
         "--host",
         default="0.0.0.0",
@@ -35,6 +41,11 @@ def main():
             port=args.port,
             log_level="info"
         )
+    elif args.wire == "msgpack":
+        # Run stdio transport with length-prefixed MessagePack frames
+        import anyio
+        from src.wire import run_msgpack_stdio
+        anyio.run(run_msgpack_stdio, mcp)
     else:
         mcp.run(transport="stdio")
 
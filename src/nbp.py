@@ -1,15 +1,111 @@
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
 from typing import Any, Optional
+import asyncio
+import datetime
+import email.utils
+import functools
 import re
+import time
 import httpx
+import msgspec
 from mcp.server.fastmcp import FastMCP
 
-mcp = FastMCP("NBP")
-
 NBP_API_BASE = "https://api.nbp.pl/api"
 USER_AGENT = "nbp-mcp-server/1.0"
 
+# Default headers sent with every NBP API request
+_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "application/json"
+}
+
+# Shared HTTP client, created lazily on first request so connections are reused
+_CLIENT: Optional[httpx.AsyncClient] = None
+# Number of active server lifespans (one per session with streamable-http)
+_LIFESPANS = 0
+
+
+async def _get_client() -> httpx.AsyncClient:
+    """Return the shared NBP API client, creating it if needed."""
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.is_closed:
+        _CLIENT = httpx.AsyncClient(
+            headers=_HEADERS,
+            timeout=30.0,
+            # HTTP/2 multiplexes concurrent requests over one connection;
+            # httpx falls back to HTTP/1.1 if the server does not negotiate it
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=10,
+                max_connections=50,
+                keepalive_expiry=60.0,
+            ),
+        )
+    return _CLIENT
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Close the shared client once the last server lifespan exits."""
+    global _CLIENT, _LIFESPANS
+    _LIFESPANS += 1
+    try:
+        yield
+    finally:
+        _LIFESPANS -= 1
+        if _LIFESPANS == 0 and _CLIENT is not None:
+            await _CLIENT.aclose()
+            _CLIENT = None
+
+
+mcp = FastMCP("NBP", lifespan=_lifespan)
+
+# Valid exchange rate table types
+TABLE_TYPES = frozenset({'a', 'b', 'c'})
+INVALID_TABLE_ERROR = "Invalid table type. Use 'a', 'b', or 'c'."
+INVALID_COUNT_ERROR = "Count must be between 1 and 255."
+
 # ISO 8601 date format: YYYY-MM-DD
 DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+# Date segments inside an NBP API URL path
+URL_DATE_PATTERN = re.compile(r'/(\d{4}-\d{2}-\d{2})(?=/)')
+
+# Longest date ranges (in days, inclusive) the NBP API serves in one query
+MAX_RATES_RANGE_DAYS = 93
+MAX_GOLD_RANGE_DAYS = 367
+# First dates the NBP API has data for
+RATES_FIRST_DATE = datetime.date(2002, 1, 2)
+GOLD_FIRST_DATE = datetime.date(2013, 1, 2)
+# Most API-sized windows a single rate history call may fetch
+MAX_RANGE_WINDOWS = 40
+RANGE_TOO_LONG_ERROR = "Date range too long. Request at most {days} days at once."
+
+# Cache lifetimes in seconds: current data changes once per business day,
+# data for past dates never changes
+TTL_CURRENT = 900
+TTL_HISTORICAL = 86400
+
+# Successful responses keyed by URL: (monotonic expiry time, data), oldest first
+_CACHE: dict[str, tuple[float, Any]] = {}
+# Most responses kept in the cache; the oldest are evicted first
+CACHE_MAX_ENTRIES = 1024
+# Per-URL locks so concurrent identical requests share one HTTP call, with the
+# number of callers using each; entries are removed once unused
+_LOCKS: dict[str, tuple[asyncio.Lock, int]] = {}
+
+# Upper bound on concurrent requests to the NBP API
+_SEMAPHORE = asyncio.Semaphore(20)
+
+# Transient failures are retried with exponential backoff (seconds)
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.1
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# Transport errors that may succeed on retry; others (e.g. unsupported
+# protocol, proxy errors) fail immediately
+RETRY_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+# Longest Retry-After delay (seconds) worth waiting for; longer ones give up
+RETRY_AFTER_MAX = 10.0
 
 
 def validate_date(date: str) -> Optional[str]:
@@ -24,70 +120,387 @@ def validate_date(date: str) -> Optional[str]:
     if not date:
         return None
 
-    if not DATE_PATTERN.match(date):
+    # Equivalent to DATE_PATTERN without the regex engine; isdecimal() matches
+    # the same characters as \d
+    if not (
+        len(date) == 10
+        and date[4] == '-'
+        and date[7] == '-'
+        and date[:4].isdecimal()
+        and date[5:7].isdecimal()
+        and date[8:].isdecimal()
+    ):
         return f"Invalid date format: '{date}'. Expected YYYY-MM-DD (e.g., 2024-01-15)"
 
     return None
 
 
-async def make_nbp_request(url: str) -> Optional[dict[str, Any] | list[dict[str, Any]]]:
-    """Make a request to the NBP API with proper error handling."""
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "application/json"
-    }
-    async with httpx.AsyncClient() as client:
+def split_date_range(
+    start_date: str,
+    end_date: str,
+    max_days: int,
+    first_date: Optional[datetime.date] = None
+) -> list[tuple[str, str]]:
+    """Split a date range into consecutive windows of at most max_days days.
+
+    The range is first clamped to the days that can have data: from first_date
+    (if given) to today.
+
+    Args:
+        start_date: Start date in YYYY-MM-DD format
+        end_date: End date in YYYY-MM-DD format
+        max_days: Maximum number of days (inclusive) per window
+        first_date: Earliest date the API has data for
+
+    Returns:
+        List of (start, end) date strings; the original range if it cannot be
+        parsed or has no days left after clamping (the API then reports the error)
+    """
+    try:
+        start = datetime.date.fromisoformat(start_date)
+        end = datetime.date.fromisoformat(end_date)
+    except ValueError:
+        return [(start_date, end_date)]
+
+    if first_date and start < first_date:
+        start = first_date
+    end = min(end, datetime.date.today())
+    if start > end:
+        return [(start_date, end_date)]
+
+    if (end - start).days < max_days:
+        return [(start.isoformat(), end.isoformat())]
+
+    windows = []
+    while (end - start).days >= max_days:
+        window_end = start + datetime.timedelta(days=max_days - 1)
+        windows.append((start.isoformat(), window_end.isoformat()))
+        start = window_end + datetime.timedelta(days=1)
+    windows.append((start.isoformat(), end.isoformat()))
+    return windows
+
+
+def cache_ttl(url: str) -> int:
+    """Return how long a response for the given NBP API URL may be cached.
+
+    Args:
+        url: NBP API URL
+
+    Returns:
+        TTL_HISTORICAL for URLs whose last date is before today, TTL_CURRENT
+        otherwise (today's data may not be published yet)
+    """
+    if '/last/' in url:
+        return TTL_CURRENT
+    dates = URL_DATE_PATTERN.findall(url)
+    if dates and dates[-1] < datetime.date.today().isoformat():
+        return TTL_HISTORICAL
+    return TTL_CURRENT
+
+
+class NBPRequestError(Exception):
+    """NBP API request failed for a reason other than missing data."""
+
+
+@asynccontextmanager
+async def _url_lock(url: str) -> AsyncIterator[None]:
+    """Hold the lock for a URL, dropping it once no caller needs it."""
+    lock, users = _LOCKS.get(url) or (asyncio.Lock(), 0)
+    _LOCKS[url] = (lock, users + 1)
+    try:
+        async with lock:
+            yield
+    finally:
+        lock, users = _LOCKS[url]
+        if users == 1:
+            del _LOCKS[url]
+        else:
+            _LOCKS[url] = (lock, users - 1)
+
+
+def _cache_put(url: str, data: Any) -> None:
+    """Cache a response, evicting the oldest entry when the cache is full.
+
+    The lifetime is fixed when the response is stored, so data fetched while a
+    date was still current does not become historical the next day.
+    """
+    _CACHE.pop(url, None)
+    _CACHE[url] = (time.monotonic() + cache_ttl(url), data)
+    if len(_CACHE) > CACHE_MAX_ENTRIES:
+        del _CACHE[next(iter(_CACHE))]
+
+
+async def make_nbp_request(
+    url: str,
+    strict: bool = False
+) -> Optional[dict[str, Any] | list[dict[str, Any]]]:
+    """Make a cached request to the NBP API.
+
+    Only successful responses are cached; failures are retried on the next call.
+
+    Args:
+        url: NBP API URL
+        strict: Raise NBPRequestError on failures instead of returning None, so
+            they can be told apart from missing data (404)
+
+    Returns:
+        Decoded response, or None if there is no data or the request failed
+    """
+    cached = _CACHE.get(url)
+    if cached and time.monotonic() < cached[0]:
+        return cached[1]
+
+    async with _url_lock(url):
+        # Another caller may have fetched the URL while we were waiting
+        cached = _CACHE.get(url)
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
+
         try:
-            response = await client.get(url, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
-        except Exception:
+            data = await _fetch(url)
+        except NBPRequestError:
+            if strict:
+                raise
             return None
+        if data is not None:
+            _cache_put(url, data)
+        return data
 
 
-def format_rate(rate: dict) -> str:
-    """Format a currency rate into a readable string."""
-    parts = []
-    parts.append(f"Currency: {rate.get('currency', 'Unknown')}")
-    parts.append(f"Code: {rate.get('code', 'Unknown')}")
+async def _fetch(url: str) -> Optional[dict[str, Any] | list[dict[str, Any]]]:
+    """Make a request to the NBP API with proper error handling.
+
+    Rate limiting, server errors and network failures are retried, waiting
+    as long as a Retry-After header asks; other errors fail immediately.
+
+    Returns:
+        Decoded response, or None if the API has no data for the URL (404)
+
+    Raises:
+        NBPRequestError: If the request failed for any other reason
+    """
+    async with _SEMAPHORE:
+        delay = 0.0
+        for attempt in range(RETRY_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(delay)
+            delay = RETRY_BACKOFF * 2 ** attempt
+            try:
+                client = await _get_client()
+                response = await client.get(url)
+                if response.status_code in RETRY_STATUS_CODES:
+                    retry_after = _retry_after(response)
+                    if retry_after is not None:
+                        if retry_after > RETRY_AFTER_MAX:
+                            break
+                        delay = retry_after
+                    continue
+                if response.status_code == 404:
+                    return None
+                response.raise_for_status()
+                return msgspec.json.decode(response.content)
+            except RETRY_ERRORS:
+                continue
+            except Exception as exc:
+                raise NBPRequestError(f"Request to {url} failed") from exc
+        raise NBPRequestError(f"Request to {url} failed after {RETRY_ATTEMPTS} attempts")
+
+
+async def _fetch_window(url: str) -> tuple[Any, bool]:
+    """Fetch one window of a history range.
+
+    Returns:
+        Tuple of (data, failed); data is None both for missing data and failures
+    """
+    try:
+        return await make_nbp_request(url, strict=True), False
+    except NBPRequestError:
+        return None, True
+
+
+def _entries_label(count: int, failed: int, windows: int) -> str:
+    """Describe the number of history entries, noting windows that failed."""
+    if failed:
+        return f"{count} entries, partial: {failed} of {windows} date windows could not be fetched"
+    return f"{count} entries"
+
 
-    if 'country' in rate:
-        parts.append(f"Country: {rate['country']}")
-    if 'symbol' in rate:
-        parts.append(f"Symbol: {rate['symbol']}")
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Return the delay in seconds requested by a Retry-After header, if any."""
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return None
+    if value.isdecimal():
+        return float(value)
+
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+def _first_or_none(data: Any) -> Optional[dict[str, Any]]:
+    """Return the first element of a non-empty list response, None otherwise."""
+    return data[0] if type(data) is list and data else None
 
-    if 'mid' in rate:
-        parts.append(f"Mid Rate: {rate['mid']}")
-    if 'bid' in rate:
-        parts.append(f"Bid Rate: {rate['bid']}")
-    if 'ask' in rate:
-        parts.append(f"Ask Rate: {rate['ask']}")
 
-    return "\n".join(parts)
+def format_series(items: list[dict], formatter_for: Callable[[dict], Callable[[dict], str]], separator: str) -> str:
+    """Format a series of NBP entries with formatters specialized on their fields.
+
+    NBP returns entries with the same fields across a table or series, so the
+    formatter is built once from the first entry. Series with mixed fields fall
+    back to building it per entry.
+
+    Args:
+        items: Non-empty list of entries
+        formatter_for: Builds a formatter for entries shaped like its argument
+        separator: String placed between formatted entries
+    """
+    keys = items[0].keys()
+    if all(item.keys() == keys for item in items):
+        return separator.join(map(formatter_for(items[0]), items))
+    return separator.join(formatter_for(item)(item) for item in items)
+
+
+# Optional currency rate fields, in display order
+RATE_FIELDS = (
+    ('country', "Country: {country}"),
+    ('symbol', "Symbol: {symbol}"),
+    ('mid', "Mid Rate: {mid}"),
+    ('bid', "Bid Rate: {bid}"),
+    ('ask', "Ask Rate: {ask}"),
+)
+
+
+def rate_formatter(sample: dict) -> Callable[[dict], str]:
+    """Build a multi-line formatter for currency rates shaped like sample."""
+    lines = [
+        "Currency: {currency}" if 'currency' in sample else "Currency: Unknown",
+        "Code: {code}" if 'code' in sample else "Code: Unknown",
+    ]
+    lines.extend(template for key, template in RATE_FIELDS if key in sample)
+    return "\n".join(lines).format_map
+
+
+def format_rate(rate: dict) -> str:
+    """Format a currency rate into a readable string."""
+    return rate_formatter(rate)(rate)
 
 
 def format_exchange_table(table: dict) -> str:
     """Format an exchange rate table into a readable string."""
-    result = []
-    result.append(f"Table: {table.get('table', 'Unknown')}")
-    result.append(f"Number: {table.get('no', 'Unknown')}")
+    get = table.get
+    trading_date = f"Trading Date: {table['tradingDate']}\n" if 'tradingDate' in table else ""
+    header = (
+        f"Table: {get('table', 'Unknown')}\n"
+        f"Number: {get('no', 'Unknown')}\n"
+        f"{trading_date}"
+        f"Effective Date: {get('effectiveDate', 'Unknown')}\n"
+        "\nRates:"
+    )
+
+    rates = get('rates', [])
+    if not rates:
+        return header
+    body = format_series(rates, rate_formatter, "\n\n")
+    return f"{header}\n\n{body}"
 
-    if 'tradingDate' in table:
-        result.append(f"Trading Date: {table['tradingDate']}")
 
-    result.append(f"Effective Date: {table.get('effectiveDate', 'Unknown')}")
-    result.append("\nRates:")
+# Optional rate entry fields, in display order
+RATE_ENTRY_FIELDS = (
+    ('tradingDate', "Trading Date: {tradingDate}"),
+    ('mid', "Mid Rate: {mid} PLN"),
+    ('bid', "Bid Rate: {bid} PLN"),
+    ('ask', "Ask Rate: {ask} PLN"),
+)
 
-    rates = table.get('rates', [])
-    for rate in rates:
-        result.append(f"\n{format_rate(rate)}")
 
-    return "\n".join(result)
+def rate_entry_formatter(sample: dict) -> Callable[[dict], str]:
+    """Build a one-line formatter for rate entries shaped like sample."""
+    fields = ["Date: {effectiveDate}" if 'effectiveDate' in sample else "Date: Unknown"]
+    fields.extend(template for key, template in RATE_ENTRY_FIELDS if key in sample)
+    return " | ".join(fields).format_map
+
+
+def format_rate_entries(rates: list[dict]) -> str:
+    """Format a series of rate entries, one per line."""
+    return format_series(rates, rate_entry_formatter, "\n")
 
 
 def format_gold_price(gold: dict) -> str:
     """Format gold price data into a readable string."""
-    return f"Date: {gold.get('data', 'Unknown')}\nPrice: {gold.get('cena', 'Unknown')} PLN/g"
+    get = gold.get
+    return f"Date: {get('data', 'Unknown')}\nPrice: {get('cena', 'Unknown')} PLN/g"
+
+
+# URL builders validate tool arguments and return (url, error). Arguments come
+# from a small set of codes, tables and dates, so single-URL results are memoized.
+@functools.lru_cache(maxsize=4096)
+def _build_rate_url(code: str, table: str, date: str) -> tuple[Optional[str], Optional[str]]:
+    """Build the URL for a single currency rate, current or for a date."""
+    if table not in TABLE_TYPES:
+        return None, INVALID_TABLE_ERROR
+
+    date_error = validate_date(date)
+    if date_error:
+        return None, date_error
+
+    if date:
+        return f"{NBP_API_BASE}/exchangerates/rates/{table}/{code}/{date}/", None
+    return f"{NBP_API_BASE}/exchangerates/rates/{table}/{code}/", None
+
+
+@functools.lru_cache(maxsize=4096)
+def _build_table_url(table: str, date: str) -> tuple[Optional[str], Optional[str]]:
+    """Build the URL for an exchange rate table, current or for a date."""
+    if table not in TABLE_TYPES:
+        return None, INVALID_TABLE_ERROR
+
+    date_error = validate_date(date)
+    if date_error:
+        return None, date_error
+
+    if date:
+        return f"{NBP_API_BASE}/exchangerates/tables/{table}/{date}/", None
+    return f"{NBP_API_BASE}/exchangerates/tables/{table}/", None
+
+
+def _build_history_urls(
+    code: str,
+    table: str,
+    start_date: str,
+    end_date: str
+) -> tuple[tuple[str, ...], Optional[str]]:
+    """Build the URLs for a currency rate history, one per API-sized window.
+
+    Not memoized: a cache entry would hold every window URL of the range.
+    """
+    if table not in TABLE_TYPES:
+        return (), INVALID_TABLE_ERROR
+
+    windows = split_date_range(start_date, end_date, MAX_RATES_RANGE_DAYS, RATES_FIRST_DATE)
+    if len(windows) > MAX_RANGE_WINDOWS:
+        return (), RANGE_TOO_LONG_ERROR.format(days=MAX_RANGE_WINDOWS * MAX_RATES_RANGE_DAYS)
+
+    return tuple(
+        f"{NBP_API_BASE}/exchangerates/rates/{table}/{code}/{start}/{end}/"
+        for start, end in windows
+    ), None
+
+
+@functools.lru_cache(maxsize=4096)
+def _build_last_n_url(code: str, table: str, count: int) -> tuple[Optional[str], Optional[str]]:
+    """Build the URL for the last N rates of a currency."""
+    if table not in TABLE_TYPES:
+        return None, INVALID_TABLE_ERROR
+
+    if count < 1 or count > 255:
+        return None, INVALID_COUNT_ERROR
+
+    return f"{NBP_API_BASE}/exchangerates/rates/{table}/{code}/last/{count}/", None
 
 
 @mcp.tool()
@@ -102,20 +515,9 @@ async def get_currency_rate(code: str, date: str = "", table: str = "a") -> str:
     code = code.upper()
     table = table.lower()
 
-    # Validate table type
-    if table not in ['a', 'b', 'c']:
-        return "Invalid table type. Use 'a', 'b', or 'c'."
-
-    # Validate date format if provided
-    date_error = validate_date(date)
-    if date_error:
-        return date_error
-
-    # Build URL based on whether date is provided
-    if date:
-        url = f"{NBP_API_BASE}/exchangerates/rates/{table}/{code}/{date}/"
-    else:
-        url = f"{NBP_API_BASE}/exchangerates/rates/{table}/{code}/"
+    url, error = _build_rate_url(code, table, date)
+    if error:
+        return error
 
     data = await make_nbp_request(url)
 
@@ -129,10 +531,11 @@ async def get_currency_rate(code: str, date: str = "", table: str = "a") -> str:
         return f"No exchange rate data available for {code}."
 
     rate_data = rates[0]
+    get = data.get
     result = [
-        f"Currency: {data.get('currency', 'Unknown')}",
-        f"Code: {data.get('code', 'Unknown')}",
-        f"Table: {data.get('table', 'Unknown').upper()}",
+        f"Currency: {get('currency', 'Unknown')}",
+        f"Code: {get('code', 'Unknown')}",
+        f"Table: {get('table', 'Unknown').upper()}",
         f"Number: {rate_data.get('no', 'Unknown')}",
         f"Effective Date: {rate_data.get('effectiveDate', 'Unknown')}",
     ]
@@ -160,30 +563,19 @@ async def get_exchange_table(date: str = "", table: str = "a") -> str:
     """
     table = table.lower()
 
-    # Validate table type
-    if table not in ['a', 'b', 'c']:
-        return "Invalid table type. Use 'a', 'b', or 'c'."
-
-    # Validate date format if provided
-    date_error = validate_date(date)
-    if date_error:
-        return date_error
-
-    # Build URL based on whether date is provided
-    if date:
-        url = f"{NBP_API_BASE}/exchangerates/tables/{table}/{date}/"
-    else:
-        url = f"{NBP_API_BASE}/exchangerates/tables/{table}/"
-
-    data = await make_nbp_request(url)
+    url, error = _build_table_url(table, date)
+    if error:
+        return error
 
     # NBP API returns a list of tables (usually containing one element)
-    if not data or not isinstance(data, list) or len(data) == 0:
+    exchange_table = _first_or_none(await make_nbp_request(url))
+
+    if exchange_table is None:
         if date:
             return f"Unable to fetch exchange rate table {table.upper()} for {date}. The date may be a weekend, holiday, or outside the available data range."
         return f"Unable to fetch current exchange rate table {table.upper()}."
 
-    return format_exchange_table(data[0])
+    return format_exchange_table(exchange_table)
 
 
 @mcp.tool()
@@ -204,41 +596,31 @@ async def get_currency_rate_history(
     code = code.upper()
     table = table.lower()
 
-    if table not in ['a', 'b', 'c']:
-        return "Invalid table type. Use 'a', 'b', or 'c'."
+    urls, error = _build_history_urls(code, table, start_date, end_date)
+    if error:
+        return error
 
-    url = f"{NBP_API_BASE}/exchangerates/rates/{table}/{code}/{start_date}/{end_date}/"
-    data = await make_nbp_request(url)
+    # Ranges longer than the API limit are fetched as concurrent windows
+    results = await asyncio.gather(*map(_fetch_window, urls))
+    responses = [response for response, _ in results if response]
+    failed = sum(failed for _, failed in results)
 
-    if not data:
+    if not responses:
         return f"Unable to fetch historical data for {code} from {start_date} to {end_date}."
 
-    rates = data.get('rates', [])
+    data = responses[0]
+    rates = [rate for response in responses for rate in response.get('rates', [])]
     if not rates:
         return f"No historical data available for {code} in the specified date range."
 
-    result = [
-        f"Currency: {data.get('currency', 'Unknown')}",
-        f"Code: {data.get('code', 'Unknown')}",
-        f"Table: {data.get('table', 'Unknown').upper()}",
-        f"\nHistorical Rates ({len(rates)} entries):\n"
-    ]
-
-    for rate in rates:
-        entry = [f"Date: {rate.get('effectiveDate', 'Unknown')}"]
-
-        if 'tradingDate' in rate:
-            entry.append(f"Trading Date: {rate['tradingDate']}")
-        if 'mid' in rate:
-            entry.append(f"Mid Rate: {rate['mid']} PLN")
-        if 'bid' in rate:
-            entry.append(f"Bid Rate: {rate['bid']} PLN")
-        if 'ask' in rate:
-            entry.append(f"Ask Rate: {rate['ask']} PLN")
-
-        result.append(" | ".join(entry))
-
-    return "\n".join(result)
+    get = data.get
+    return (
+        f"Currency: {get('currency', 'Unknown')}\n"
+        f"Code: {get('code', 'Unknown')}\n"
+        f"Table: {get('table', 'Unknown').upper()}\n"
+        f"\nHistorical Rates ({_entries_label(len(rates), failed, len(urls))}):\n\n"
+        f"{format_rate_entries(rates)}"
+    )
 
 
 @mcp.tool()
@@ -253,13 +635,10 @@ async def get_currency_rate_last_n(code: str, count: int, table: str = "a") -> s
     code = code.upper()
     table = table.lower()
 
-    if table not in ['a', 'b', 'c']:
-        return "Invalid table type. Use 'a', 'b', or 'c'."
-
-    if count < 1 or count > 255:
-        return "Count must be between 1 and 255."
+    url, error = _build_last_n_url(code, table, count)
+    if error:
+        return error
 
-    url = f"{NBP_API_BASE}/exchangerates/rates/{table}/{code}/last/{count}/"
     data = await make_nbp_request(url)
 
     if not data:
@@ -269,28 +648,14 @@ async def get_currency_rate_last_n(code: str, count: int, table: str = "a") -> s
     if not rates:
         return f"No rate data available for {code}."
 
-    result = [
-        f"Currency: {data.get('currency', 'Unknown')}",
-        f"Code: {data.get('code', 'Unknown')}",
-        f"Table: {data.get('table', 'Unknown').upper()}",
-        f"\nLast {len(rates)} Rates:\n"
-    ]
-
-    for rate in rates:
-        entry = [f"Date: {rate.get('effectiveDate', 'Unknown')}"]
-
-        if 'tradingDate' in rate:
-            entry.append(f"Trading Date: {rate['tradingDate']}")
-        if 'mid' in rate:
-            entry.append(f"Mid Rate: {rate['mid']} PLN")
-        if 'bid' in rate:
-            entry.append(f"Bid Rate: {rate['bid']} PLN")
-        if 'ask' in rate:
-            entry.append(f"Ask Rate: {rate['ask']} PLN")
-
-        result.append(" | ".join(entry))
-
-    return "\n".join(result)
+    get = data.get
+    return (
+        f"Currency: {get('currency', 'Unknown')}\n"
+        f"Code: {get('code', 'Unknown')}\n"
+        f"Table: {get('table', 'Unknown').upper()}\n"
+        f"\nLast {len(rates)} Rates:\n\n"
+        f"{format_rate_entries(rates)}"
+    )
 
 
 @mcp.tool()
@@ -311,14 +676,13 @@ async def get_gold_price(date: str = "") -> str:
     else:
         url = f"{NBP_API_BASE}/cenyzlota/"
 
-    data = await make_nbp_request(url)
+    gold = _first_or_none(await make_nbp_request(url))
 
-    if not data or not isinstance(data, list) or len(data) == 0:
+    if gold is None:
         if date:
             return f"Unable to fetch gold price for {date}. The date may be a weekend, holiday, or outside the available data range (data available from 2013-01-02)."
         return "Unable to fetch current gold price."
 
-    gold = data[0]
     return format_gold_price(gold)
 
 
@@ -330,21 +694,27 @@ async def get_gold_price_history(start_date: str, end_date: str) -> str:
         start_date: Start date in YYYY-MM-DD format (ISO 8601)
         end_date: End date in YYYY-MM-DD format (ISO 8601)
     """
-    url = f"{NBP_API_BASE}/cenyzlota/{start_date}/{end_date}/"
-    data = await make_nbp_request(url)
-
-    if data is None or not isinstance(data, list):
+    # Ranges longer than the API limit are fetched as concurrent windows; once
+    # clamped to the data since 2013 they stay far below MAX_RANGE_WINDOWS
+    windows = split_date_range(start_date, end_date, MAX_GOLD_RANGE_DAYS, GOLD_FIRST_DATE)
+
+    results = await asyncio.gather(*(
+        _fetch_window(f"{NBP_API_BASE}/cenyzlota/{start}/{end}/")
+        for start, end in windows
+    ))
+    responses = [response for response, _ in results if type(response) is list]
+    failed = sum(failed for _, failed in results)
+
+    if not responses:
         return f"Unable to fetch gold price history from {start_date} to {end_date}."
 
+    data = [gold for response in responses for gold in response]
+
     if len(data) == 0:
         return f"No gold price data available for the specified date range."
 
-    result = [f"Gold Price History ({len(data)} entries):\n"]
-
-    for gold in data:
-        result.append(format_gold_price(gold))
-
-    return "\n".join(result)
+    prices = "\n".join(map(format_gold_price, data))
+    return f"Gold Price History ({_entries_label(len(data), failed, len(windows))}):\n\n{prices}"
 
 
 @mcp.tool()
@@ -355,20 +725,16 @@ async def get_gold_price_last_n(count: int) -> str:
         count: Number of last gold prices to retrieve (max 255)
     """
     if count < 1 or count > 255:
-        return "Count must be between 1 and 255."
+        return INVALID_COUNT_ERROR
 
     url = f"{NBP_API_BASE}/cenyzlota/last/{count}/"
     data = await make_nbp_request(url)
 
-    if data is None or not isinstance(data, list):
+    if type(data) is not list:
         return f"Unable to fetch last {count} gold prices."
 
     if len(data) == 0:
         return "No gold price data available."
 
-    result = [f"Last {len(data)} Gold Prices:\n"]
-
-    for gold in data:
-        result.append(format_gold_price(gold))
-
-    return "\n".join(result)
+    prices = "\n".join(map(format_gold_price, data))
+    return f"Last {len(data)} Gold Prices:\n\n{prices}"
@@ -0,0 +1,114 @@
+"""MessagePack stdio transport for the NBP MCP server.
+
+Standard MCP stdio transport exchanges newline-delimited JSON. This module
+provides an opt-in alternative for clients that speak length-prefixed
+MessagePack frames: each message is a 4-byte big-endian length followed by the
+MessagePack-encoded JSON-RPC message.
+"""
+import sys
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+import anyio
+import anyio.lowlevel
+import msgspec
+import mcp.types as types
+from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.message import SessionMessage
+
+# Size of the big-endian length prefix in bytes
+FRAME_HEADER_SIZE = 4
+
+
+def encode_frame(message: Any) -> bytes:
+    """Encode a message as a length-prefixed MessagePack frame."""
+    payload = msgspec.msgpack.encode(message)
+    return len(payload).to_bytes(FRAME_HEADER_SIZE, 'big') + payload
+
+
+async def read_frame(stream: anyio.AsyncFile[bytes]) -> Optional[bytes]:
+    """Read the payload of one length-prefixed frame.
+
+    Returns:
+        Frame payload, or None at end of stream
+    """
+    header = await stream.read(FRAME_HEADER_SIZE)
+    if len(header) < FRAME_HEADER_SIZE:
+        return None
+
+    size = int.from_bytes(header, 'big')
+    payload = await stream.read(size)
+    if len(payload) < size:
+        return None
+
+    return payload
+
+
+@asynccontextmanager
+async def msgpack_stdio_server(
+    stdin: anyio.AsyncFile[bytes] | None = None,
+    stdout: anyio.AsyncFile[bytes] | None = None,
+):
+    """Server transport exchanging MessagePack frames over stdin/stdout.
+
+    Mirrors mcp.server.stdio.stdio_server, yielding the same pair of memory
+    streams so it can drive any low-level MCP server.
+    """
+    if not stdin:
+        stdin = anyio.wrap_file(sys.stdin.buffer)
+    if not stdout:
+        stdout = anyio.wrap_file(sys.stdout.buffer)
+
+    read_stream: MemoryObjectReceiveStream[SessionMessage | Exception]
+    read_stream_writer: MemoryObjectSendStream[SessionMessage | Exception]
+
+    write_stream: MemoryObjectSendStream[SessionMessage]
+    write_stream_reader: MemoryObjectReceiveStream[SessionMessage]
+
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+
+    async def stdin_reader():
+        try:
+            async with read_stream_writer:
+                while (payload := await read_frame(stdin)) is not None:
+                    try:
+                        message = types.JSONRPCMessage.model_validate(
+                            msgspec.msgpack.decode(payload)
+                        )
+                    except Exception as exc:
+                        await read_stream_writer.send(exc)
+                        continue
+
+                    await read_stream_writer.send(SessionMessage(message))
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async def stdout_writer():
+        try:
+            async with write_stream_reader:
+                async for session_message in write_stream_reader:
+                    message = session_message.message.model_dump(
+                        mode="json", by_alias=True, exclude_none=True
+                    )
+                    await stdout.write(encode_frame(message))
+                    await stdout.flush()
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(stdin_reader)
+        tg.start_soon(stdout_writer)
+        yield read_stream, write_stream
+
+
+async def run_msgpack_stdio(server: FastMCP) -> None:
+    """Run a FastMCP server over the MessagePack stdio transport."""
+    lowlevel_server = server._mcp_server
+    async with msgpack_stdio_server() as (read_stream, write_stream):
+        await lowlevel_server.run(
+            read_stream,
+            write_stream,
+            lowlevel_server.create_initialization_options(),
+        )
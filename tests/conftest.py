@@ -1,5 +1,59 @@
 """Pytest configuration and fixtures for NBP MCP Server tests."""
+import httpx
 import pytest
+from unittest.mock import AsyncMock
+from src import nbp
+from tests.utils import async_return
+
+
+@pytest.fixture(autouse=True)
+def mock_nbp(monkeypatch):
+    """Replace NBP API requests made by the tools with an AsyncMock.
+
+    Tests set return_value or side_effect on the returned mock. Code that
+    imported make_nbp_request directly (such as its own tests) keeps the real one.
+    """
+    mock = AsyncMock(return_value=None)
+    monkeypatch.setattr("src.nbp.make_nbp_request", mock)
+    yield mock
+
+
+@pytest.fixture
+async def mock_transport(monkeypatch):
+    """Route the shared NBP HTTP client through an httpx.MockTransport.
+
+    Yields a function that installs a request handler and returns the list of
+    requests it received. The client keeps the real default headers and is
+    closed after the test.
+    """
+    clients = []
+
+    def install(handler):
+        requests = []
+
+        def record(request):
+            requests.append(request)
+            return handler(request)
+
+        client = httpx.AsyncClient(headers=nbp._HEADERS, transport=httpx.MockTransport(record))
+        clients.append(client)
+        monkeypatch.setattr("src.nbp._get_client", async_return(client))
+        return requests
+
+    yield install
+
+    for client in clients:
+        await client.aclose()
+
+
+@pytest.fixture(autouse=True)
+def clear_nbp_cache():
+    """Start every test with an empty NBP response cache."""
+    nbp._CACHE.clear()
+    nbp._LOCKS.clear()
+    yield
+    nbp._CACHE.clear()
+    nbp._LOCKS.clear()
 
 
 @pytest.fixture
@@ -1,7 +1,6 @@
 """Tests for currency rate tools."""
-import pytest
-from unittest.mock import AsyncMock, patch
 from src.nbp import (
+    NBPRequestError,
     get_currency_rate,
     get_exchange_table,
     get_currency_rate_history,
@@ -9,24 +8,147 @@ from src.nbp import (
 )
 
 
-@pytest.mark.asyncio
-async def test_get_currency_rate_success():
-    """Test getting current currency rate successfully."""
-    mock_response = {
+USD_RATE_A = {
+    "table": "A",
+    "currency": "dolar amerykański",
+    "code": "USD",
+    "rates": [
+        {
+            "no": "001/A/NBP/2024",
+            "effectiveDate": "2024-01-02",
+            "mid": 3.9876
+        }
+    ]
+}
+
+USD_RATE_C = {
+    "table": "C",
+    "currency": "dolar amerykański",
+    "code": "USD",
+    "rates": [
+        {
+            "no": "001/C/NBP/2024",
+            "effectiveDate": "2024-01-02",
+            "tradingDate": "2024-01-02",
+            "bid": 3.9500,
+            "ask": 4.0250
+        }
+    ]
+}
+
+USD_NO_RATES = {
+    "table": "A",
+    "currency": "dolar amerykański",
+    "code": "USD",
+    "rates": []
+}
+
+TABLE_A = [
+    {
         "table": "A",
-        "currency": "dolar amerykański",
-        "code": "USD",
+        "no": "001/A/NBP/2024",
+        "effectiveDate": "2024-01-02",
         "rates": [
             {
-                "no": "001/A/NBP/2024",
-                "effectiveDate": "2024-01-02",
+                "currency": "dolar amerykański",
+                "code": "USD",
                 "mid": 3.9876
+            },
+            {
+                "currency": "euro",
+                "code": "EUR",
+                "mid": 4.3215
             }
         ]
     }
+]
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_currency_rate("USD", table="a")
+USD_HISTORY = {
+    "table": "A",
+    "currency": "dolar amerykański",
+    "code": "USD",
+    "rates": [
+        {
+            "effectiveDate": "2024-01-02",
+            "mid": 3.9876
+        },
+        {
+            "effectiveDate": "2024-01-03",
+            "mid": 3.9912
+        },
+        {
+            "effectiveDate": "2024-01-04",
+            "mid": 3.9850
+        }
+    ]
+}
+
+EUR_LAST_3 = {
+    "table": "A",
+    "currency": "euro",
+    "code": "EUR",
+    "rates": [
+        {
+            "effectiveDate": "2024-01-02",
+            "mid": 4.3215
+        },
+        {
+            "effectiveDate": "2024-01-03",
+            "mid": 4.3198
+        },
+        {
+            "effectiveDate": "2024-01-04",
+            "mid": 4.3250
+        }
+    ]
+}
+
+USD_RATE_MINIMAL = {
+    "table": "A",
+    "currency": "dolar amerykański",
+    "code": "USD",
+    "rates": [{"effectiveDate": "2024-01-02", "mid": 3.9876}]
+}
+
+EUR_RATE_DATED = {
+    "table": "A",
+    "currency": "euro",
+    "code": "EUR",
+    "rates": [
+        {
+            "no": "015/A/NBP/2024",
+            "effectiveDate": "2024-01-15",
+            "mid": 4.3215
+        }
+    ]
+}
+
+TABLE_A_DATED = [
+    {
+        "table": "A",
+        "no": "015/A/NBP/2024",
+        "effectiveDate": "2024-01-15",
+        "rates": [
+            {
+                "currency": "dolar amerykański",
+                "code": "USD",
+                "mid": 3.9876
+            },
+            {
+                "currency": "euro",
+                "code": "EUR",
+                "mid": 4.3215
+            }
+        ]
+    }
+]
+
+
+async def test_get_currency_rate_success(mock_nbp):
+    """Test getting current currency rate successfully."""
+    mock_nbp.return_value = USD_RATE_A
+
+    result = await get_currency_rate("USD", table="a")
 
     assert "Currency: dolar amerykański" in result
     assert "Code: USD" in result
@@ -36,26 +158,11 @@ async def test_get_currency_rate_success():
     assert "Effective Date: 2024-01-02" in result
 
 
-@pytest.mark.asyncio
-async def test_get_currency_rate_table_c():
+async def test_get_currency_rate_table_c(mock_nbp):
     """Test getting currency rate from table C with bid/ask rates."""
-    mock_response = {
-        "table": "C",
-        "currency": "dolar amerykański",
-        "code": "USD",
-        "rates": [
-            {
-                "no": "001/C/NBP/2024",
-                "effectiveDate": "2024-01-02",
-                "tradingDate": "2024-01-02",
-                "bid": 3.9500,
-                "ask": 4.0250
-            }
-        ]
-    }
+    mock_nbp.return_value = USD_RATE_C
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_currency_rate("USD", table="c")
+    result = await get_currency_rate("USD", table="c")
 
     assert "Currency: dolar amerykański" in result
     assert "Number: 001/C/NBP/2024" in result
@@ -64,63 +171,35 @@ async def test_get_currency_rate_table_c():
     assert "Trading Date: 2024-01-02" in result
 
 
-@pytest.mark.asyncio
 async def test_get_currency_rate_invalid_table():
     """Test getting currency rate with invalid table type."""
     result = await get_currency_rate("USD", table="x")
     assert "Invalid table type" in result
 
 
-@pytest.mark.asyncio
-async def test_get_currency_rate_api_error():
+async def test_get_currency_rate_api_error(mock_nbp):
     """Test getting currency rate when API returns error."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=None)):
-        result = await get_currency_rate("USD", table="a")
+    mock_nbp.return_value = None
+
+    result = await get_currency_rate("USD", table="a")
 
     assert "Unable to fetch current exchange rate" in result
 
 
-@pytest.mark.asyncio
-async def test_get_currency_rate_no_rates():
+async def test_get_currency_rate_no_rates(mock_nbp):
     """Test getting currency rate when no rates are available."""
-    mock_response = {
-        "table": "A",
-        "currency": "dolar amerykański",
-        "code": "USD",
-        "rates": []
-    }
+    mock_nbp.return_value = USD_NO_RATES
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_currency_rate("USD", table="a")
+    result = await get_currency_rate("USD", table="a")
 
     assert "No exchange rate data available" in result
 
 
-@pytest.mark.asyncio
-async def test_get_exchange_table_success():
+async def test_get_exchange_table_success(mock_nbp):
     """Test getting complete exchange table successfully."""
-    mock_response = [
-        {
-            "table": "A",
-            "no": "001/A/NBP/2024",
-            "effectiveDate": "2024-01-02",
-            "rates": [
-                {
-                    "currency": "dolar amerykański",
-                    "code": "USD",
-                    "mid": 3.9876
-                },
-                {
-                    "currency": "euro",
-                    "code": "EUR",
-                    "mid": 4.3215
-                }
-            ]
-        }
-    ]
+    mock_nbp.return_value = TABLE_A
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_exchange_table(table="a")
+    result = await get_exchange_table(table="a")
 
     assert "Table: A" in result
     assert "Number: 001/A/NBP/2024" in result
@@ -129,47 +208,26 @@ async def test_get_exchange_table_success():
     assert "Currency: euro" in result
 
 
-@pytest.mark.asyncio
 async def test_get_exchange_table_invalid_type():
     """Test getting exchange table with invalid table type."""
     result = await get_exchange_table(table="z")
     assert "Invalid table type" in result
 
 
-@pytest.mark.asyncio
-async def test_get_exchange_table_api_error():
+async def test_get_exchange_table_api_error(mock_nbp):
     """Test getting exchange table when API returns error."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=None)):
-        result = await get_exchange_table(table="a")
+    mock_nbp.return_value = None
+
+    result = await get_exchange_table(table="a")
 
     assert "Unable to fetch current exchange rate table" in result
 
 
-@pytest.mark.asyncio
-async def test_get_currency_rate_history_success():
+async def test_get_currency_rate_history_success(mock_nbp):
     """Test getting historical currency rates successfully."""
-    mock_response = {
-        "table": "A",
-        "currency": "dolar amerykański",
-        "code": "USD",
-        "rates": [
-            {
-                "effectiveDate": "2024-01-02",
-                "mid": 3.9876
-            },
-            {
-                "effectiveDate": "2024-01-03",
-                "mid": 3.9912
-            },
-            {
-                "effectiveDate": "2024-01-04",
-                "mid": 3.9850
-            }
-        ]
-    }
+    mock_nbp.return_value = USD_HISTORY
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_currency_rate_history("USD", "2024-01-02", "2024-01-04", "a")
+    result = await get_currency_rate_history("USD", "2024-01-02", "2024-01-04", "a")
 
     assert "Historical Rates (3 entries)" in result
     assert "Date: 2024-01-02" in result
@@ -178,47 +236,83 @@ async def test_get_currency_rate_history_success():
     assert "Date: 2024-01-04" in result
 
 
-@pytest.mark.asyncio
+async def test_get_currency_rate_history_long_range(mock_nbp):
+    """Test that long date ranges are fetched in windows and merged."""
+    responses = {
+        "https://api.nbp.pl/api/exchangerates/rates/a/USD/2024-01-01/2024-04-02/": {
+            "table": "A",
+            "currency": "dolar amerykański",
+            "code": "USD",
+            "rates": [{"effectiveDate": "2024-01-02", "mid": 3.9876}]
+        },
+        "https://api.nbp.pl/api/exchangerates/rates/a/USD/2024-04-03/2024-05-31/": {
+            "table": "A",
+            "currency": "dolar amerykański",
+            "code": "USD",
+            "rates": [{"effectiveDate": "2024-05-31", "mid": 3.9321}]
+        },
+    }
+    mock_nbp.side_effect = lambda url, **kwargs: responses.get(url)
+
+    result = await get_currency_rate_history("USD", "2024-01-01", "2024-05-31", "a")
+
+    assert mock_nbp.await_count == 2
+    assert "Historical Rates (2 entries)" in result
+    assert "Date: 2024-01-02 | Mid Rate: 3.9876 PLN" in result
+    assert "Date: 2024-05-31 | Mid Rate: 3.9321 PLN" in result
+
+
 async def test_get_currency_rate_history_invalid_table():
     """Test getting historical rates with invalid table type."""
     result = await get_currency_rate_history("USD", "2024-01-01", "2024-01-31", "d")
     assert "Invalid table type" in result
 
 
-@pytest.mark.asyncio
-async def test_get_currency_rate_history_api_error():
+async def test_get_currency_rate_history_partial(mock_nbp):
+    """Test that windows that failed are reported instead of silently dropped."""
+    def respond(url, **kwargs):
+        if url.endswith("/2024-04-03/2024-05-31/"):
+            raise NBPRequestError(url)
+        return USD_HISTORY
+
+    mock_nbp.side_effect = respond
+
+    result = await get_currency_rate_history("USD", "2024-01-01", "2024-05-31", "a")
+
+    assert "Historical Rates (3 entries, partial: 1 of 2 date windows could not be fetched)" in result
+
+
+async def test_get_currency_rate_history_all_windows_failed(mock_nbp):
+    """Test the error message when every window fails."""
+    mock_nbp.side_effect = NBPRequestError("unavailable")
+
+    result = await get_currency_rate_history("USD", "2024-01-01", "2024-05-31", "a")
+
+    assert "Unable to fetch historical data" in result
+
+
+async def test_get_currency_rate_history_range_too_long(mock_nbp):
+    """Test that ranges spanning too many API windows are rejected."""
+    result = await get_currency_rate_history("USD", "1000-01-01", "9999-12-31", "a")
+
+    assert "Date range too long" in result
+    mock_nbp.assert_not_awaited()
+
+
+async def test_get_currency_rate_history_api_error(mock_nbp):
     """Test getting historical rates when API returns error."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=None)):
-        result = await get_currency_rate_history("USD", "2024-01-01", "2024-01-31", "a")
+    mock_nbp.return_value = None
+
+    result = await get_currency_rate_history("USD", "2024-01-01", "2024-01-31", "a")
 
     assert "Unable to fetch historical data" in result
 
 
-@pytest.mark.asyncio
-async def test_get_currency_rate_last_n_success():
+async def test_get_currency_rate_last_n_success(mock_nbp):
     """Test getting last N currency rates successfully."""
-    mock_response = {
-        "table": "A",
-        "currency": "euro",
-        "code": "EUR",
-        "rates": [
-            {
-                "effectiveDate": "2024-01-02",
-                "mid": 4.3215
-            },
-            {
-                "effectiveDate": "2024-01-03",
-                "mid": 4.3198
-            },
-            {
-                "effectiveDate": "2024-01-04",
-                "mid": 4.3250
-            }
-        ]
-    }
+    mock_nbp.return_value = EUR_LAST_3
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_currency_rate_last_n("EUR", 3, "a")
+    result = await get_currency_rate_last_n("EUR", 3, "a")
 
     assert "Last 3 Rates" in result
     assert "Currency: euro" in result
@@ -226,7 +320,6 @@ async def test_get_currency_rate_last_n_success():
     assert "Mid Rate: 4.3215 PLN" in result
 
 
-@pytest.mark.asyncio
 async def test_get_currency_rate_last_n_invalid_count():
     """Test getting last N rates with invalid count."""
     result = await get_currency_rate_last_n("USD", 0, "a")
@@ -236,60 +329,39 @@ async def test_get_currency_rate_last_n_invalid_count():
     assert "Count must be between 1 and 255" in result
 
 
-@pytest.mark.asyncio
 async def test_get_currency_rate_last_n_invalid_table():
     """Test getting last N rates with invalid table type."""
     result = await get_currency_rate_last_n("USD", 10, "e")
     assert "Invalid table type" in result
 
 
-@pytest.mark.asyncio
-async def test_get_currency_rate_last_n_api_error():
+async def test_get_currency_rate_last_n_api_error(mock_nbp):
     """Test getting last N rates when API returns error."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=None)):
-        result = await get_currency_rate_last_n("USD", 10, "a")
+    mock_nbp.return_value = None
+
+    result = await get_currency_rate_last_n("USD", 10, "a")
 
     assert "Unable to fetch last 10 rates" in result
 
 
-@pytest.mark.asyncio
-async def test_currency_code_case_insensitive():
+async def test_currency_code_case_insensitive(mock_nbp):
     """Test that currency codes are case-insensitive."""
-    mock_response = {
-        "table": "A",
-        "currency": "dolar amerykański",
-        "code": "USD",
-        "rates": [{"effectiveDate": "2024-01-02", "mid": 3.9876}]
-    }
+    mock_nbp.return_value = USD_RATE_MINIMAL
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result_lower = await get_currency_rate("usd", table="a")
-        result_upper = await get_currency_rate("USD", table="a")
-        result_mixed = await get_currency_rate("UsD", table="a")
+    result_lower = await get_currency_rate("usd", table="a")
+    result_upper = await get_currency_rate("USD", table="a")
+    result_mixed = await get_currency_rate("UsD", table="a")
 
     assert "Currency: dolar amerykański" in result_lower
     assert "Currency: dolar amerykański" in result_upper
     assert "Currency: dolar amerykański" in result_mixed
 
 
-@pytest.mark.asyncio
-async def test_get_currency_rate_with_date():
+async def test_get_currency_rate_with_date(mock_nbp):
     """Test getting currency rate for a specific date."""
-    mock_response = {
-        "table": "A",
-        "currency": "euro",
-        "code": "EUR",
-        "rates": [
-            {
-                "no": "015/A/NBP/2024",
-                "effectiveDate": "2024-01-15",
-                "mid": 4.3215
-            }
-        ]
-    }
+    mock_nbp.return_value = EUR_RATE_DATED
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_currency_rate("EUR", date="2024-01-15", table="a")
+    result = await get_currency_rate("EUR", date="2024-01-15", table="a")
 
     assert "Currency: euro" in result
     assert "Code: EUR" in result
@@ -297,7 +369,6 @@ async def test_get_currency_rate_with_date():
     assert "Mid Rate: 4.3215 PLN" in result
 
 
-@pytest.mark.asyncio
 async def test_get_currency_rate_invalid_date_format():
     """Test getting currency rate with invalid date format."""
     result = await get_currency_rate("USD", date="01-15-2024", table="a")
@@ -311,42 +382,22 @@ async def test_get_currency_rate_invalid_date_format():
     assert "Invalid date format" in result
 
 
-@pytest.mark.asyncio
-async def test_get_currency_rate_date_not_found():
+async def test_get_currency_rate_date_not_found(mock_nbp):
     """Test getting currency rate when date has no data (weekend/holiday)."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=None)):
-        result = await get_currency_rate("USD", date="2024-01-01", table="a")
+    mock_nbp.return_value = None
+
+    result = await get_currency_rate("USD", date="2024-01-01", table="a")
 
     assert "Unable to fetch exchange rate" in result
     assert "2024-01-01" in result
     assert "weekend, holiday" in result
 
 
-@pytest.mark.asyncio
-async def test_get_exchange_table_with_date():
+async def test_get_exchange_table_with_date(mock_nbp):
     """Test getting exchange table for a specific date."""
-    mock_response = [
-        {
-            "table": "A",
-            "no": "015/A/NBP/2024",
-            "effectiveDate": "2024-01-15",
-            "rates": [
-                {
-                    "currency": "dolar amerykański",
-                    "code": "USD",
-                    "mid": 3.9876
-                },
-                {
-                    "currency": "euro",
-                    "code": "EUR",
-                    "mid": 4.3215
-                }
-            ]
-        }
-    ]
+    mock_nbp.return_value = TABLE_A_DATED
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_exchange_table(date="2024-01-15", table="a")
+    result = await get_exchange_table(date="2024-01-15", table="a")
 
     assert "Table: A" in result
     assert "Effective Date: 2024-01-15" in result
@@ -354,7 +405,6 @@ async def test_get_exchange_table_with_date():
     assert "Currency: euro" in result
 
 
-@pytest.mark.asyncio
 async def test_get_exchange_table_invalid_date_format():
     """Test getting exchange table with invalid date format."""
     result = await get_exchange_table(date="15-01-2024", table="a")
@@ -362,11 +412,11 @@ async def test_get_exchange_table_invalid_date_format():
     assert "YYYY-MM-DD" in result
 
 
-@pytest.mark.asyncio
-async def test_get_exchange_table_date_not_found():
+async def test_get_exchange_table_date_not_found(mock_nbp):
     """Test getting exchange table when date has no data."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=None)):
-        result = await get_exchange_table(date="2024-01-01", table="a")
+    mock_nbp.return_value = None
+
+    result = await get_exchange_table(date="2024-01-01", table="a")
 
     assert "Unable to fetch exchange rate table" in result
     assert "2024-01-01" in result
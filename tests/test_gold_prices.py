@@ -1,209 +1,228 @@
 """Tests for gold price tools."""
 import pytest
-from unittest.mock import AsyncMock, patch
+from tests.utils import assert_all_in
 from src.nbp import (
+    NBPRequestError,
     get_gold_price,
     get_gold_price_history,
     get_gold_price_last_n,
 )
 
 
-@pytest.mark.asyncio
-async def test_get_gold_price_success():
+GOLD_ONE = [
+    {
+        "data": "2024-01-02",
+        "cena": 245.67
+    }
+]
+
+GOLD_HISTORY = [
+    {
+        "data": "2024-01-02",
+        "cena": 245.67
+    },
+    {
+        "data": "2024-01-03",
+        "cena": 246.12
+    },
+    {
+        "data": "2024-01-04",
+        "cena": 245.89
+    }
+]
+
+GOLD_LAST_3 = [
+    {
+        "data": "2024-01-04",
+        "cena": 245.89
+    },
+    {
+        "data": "2024-01-03",
+        "cena": 246.12
+    },
+    {
+        "data": "2024-01-02",
+        "cena": 245.67
+    }
+]
+
+GOLD_DATED = [
+    {
+        "data": "2024-01-15",
+        "cena": 248.50
+    }
+]
+
+
+async def test_get_gold_price_success(mock_nbp):
     """Test getting current gold price successfully."""
-    mock_response = [
-        {
-            "data": "2024-01-02",
-            "cena": 245.67
-        }
-    ]
+    mock_nbp.return_value = GOLD_ONE
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_gold_price()
+    result = await get_gold_price()
 
     assert "Date: 2024-01-02" in result
     assert "Price: 245.67 PLN/g" in result
 
 
-@pytest.mark.asyncio
-async def test_get_gold_price_api_error():
+async def test_get_gold_price_api_error(mock_nbp):
     """Test getting gold price when API returns error."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=None)):
-        result = await get_gold_price()
+    mock_nbp.return_value = None
+
+    result = await get_gold_price()
 
     assert "Unable to fetch current gold price" in result
 
 
-@pytest.mark.asyncio
-async def test_get_gold_price_empty_response():
+async def test_get_gold_price_empty_response(mock_nbp):
     """Test getting gold price when API returns empty list."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=[])):
-        result = await get_gold_price()
+    mock_nbp.return_value = []
+
+    result = await get_gold_price()
 
     assert "Unable to fetch current gold price" in result
 
 
-@pytest.mark.asyncio
-async def test_get_gold_price_history_success():
+async def test_get_gold_price_history_success(mock_nbp):
     """Test getting historical gold prices successfully."""
-    mock_response = [
-        {
-            "data": "2024-01-02",
-            "cena": 245.67
-        },
-        {
-            "data": "2024-01-03",
-            "cena": 246.12
-        },
-        {
-            "data": "2024-01-04",
-            "cena": 245.89
-        }
-    ]
-
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_gold_price_history("2024-01-02", "2024-01-04")
-
-    assert "Gold Price History (3 entries)" in result
-    assert "Date: 2024-01-02" in result
-    assert "Price: 245.67 PLN/g" in result
+    mock_nbp.return_value = GOLD_HISTORY
+
+    result = await get_gold_price_history("2024-01-02", "2024-01-04")
+
+    assert_all_in(
+        result,
+        "Gold Price History (3 entries)",
+        "Date: 2024-01-02",
+        "Price: 245.67 PLN/g",
+        "Date: 2024-01-03",
+        "Price: 246.12 PLN/g",
+        "Date: 2024-01-04",
+        "Price: 245.89 PLN/g",
+    )
+
+
+async def test_get_gold_price_history_long_range(mock_nbp):
+    """Test that long date ranges are fetched in windows and merged."""
+    responses = {
+        "https://api.nbp.pl/api/cenyzlota/2023-01-01/2024-01-02/": [
+            {"data": "2023-01-02", "cena": 254.12}
+        ],
+        "https://api.nbp.pl/api/cenyzlota/2024-01-03/2024-01-31/": [
+            {"data": "2024-01-03", "cena": 246.12}
+        ],
+    }
+    mock_nbp.side_effect = lambda url, **kwargs: responses.get(url)
+
+    result = await get_gold_price_history("2023-01-01", "2024-01-31")
+
+    assert mock_nbp.await_count == 2
+    assert "Gold Price History (2 entries)" in result
+    assert "Date: 2023-01-02" in result
     assert "Date: 2024-01-03" in result
-    assert "Price: 246.12 PLN/g" in result
-    assert "Date: 2024-01-04" in result
-    assert "Price: 245.89 PLN/g" in result
 
 
-@pytest.mark.asyncio
-async def test_get_gold_price_history_api_error():
-    """Test getting gold price history when API returns error."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=None)):
-        result = await get_gold_price_history("2024-01-01", "2024-01-31")
-
-    assert "Unable to fetch gold price history" in result
+async def test_get_gold_price_history_partial(mock_nbp):
+    """Test that windows that failed are reported instead of silently dropped."""
+    def respond(url, **kwargs):
+        if url == "https://api.nbp.pl/api/cenyzlota/2023-01-01/2024-01-02/":
+            raise NBPRequestError(url)
+        return [{"data": "2024-01-03", "cena": 246.12}]
 
+    mock_nbp.side_effect = respond
 
-@pytest.mark.asyncio
-async def test_get_gold_price_history_empty_data():
-    """Test getting gold price history when no data is available."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=[])):
-        result = await get_gold_price_history("2024-01-01", "2024-01-31")
+    result = await get_gold_price_history("2023-01-01", "2024-01-31")
 
-    assert "No gold price data available" in result
+    assert "Gold Price History (1 entries, partial: 1 of 2 date windows could not be fetched)" in result
+    assert "Date: 2024-01-03" in result
 
 
-@pytest.mark.asyncio
-async def test_get_gold_price_last_n_success():
-    """Test getting last N gold prices successfully."""
-    mock_response = [
-        {
-            "data": "2024-01-04",
-            "cena": 245.89
-        },
-        {
-            "data": "2024-01-03",
-            "cena": 246.12
-        },
-        {
-            "data": "2024-01-02",
-            "cena": 245.67
-        }
-    ]
-
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_gold_price_last_n(3)
-
-    assert "Last 3 Gold Prices" in result
-    assert "Date: 2024-01-04" in result
-    assert "Price: 245.89 PLN/g" in result
-    assert "Date: 2024-01-03" in result
-    assert "Date: 2024-01-02" in result
+async def test_get_gold_price_history_clamps_range(mock_nbp):
+    """Test that ranges are clamped to the days NBP has gold prices for."""
+    mock_nbp.return_value = GOLD_ONE
 
+    await get_gold_price_history("2000-01-01", "2013-12-31")
 
-@pytest.mark.asyncio
-async def test_get_gold_price_last_n_invalid_count():
-    """Test getting last N gold prices with invalid count."""
-    result = await get_gold_price_last_n(0)
-    assert "Count must be between 1 and 255" in result
+    mock_nbp.assert_awaited_once_with(
+        "https://api.nbp.pl/api/cenyzlota/2013-01-02/2013-12-31/", strict=True
+    )
 
-    result = await get_gold_price_last_n(256)
-    assert "Count must be between 1 and 255" in result
 
-    result = await get_gold_price_last_n(-5)
-    assert "Count must be between 1 and 255" in result
+async def test_get_gold_price_history_api_error(mock_nbp):
+    """Test getting gold price history when API returns error."""
+    mock_nbp.return_value = None
 
+    result = await get_gold_price_history("2024-01-01", "2024-01-31")
 
-@pytest.mark.asyncio
-async def test_get_gold_price_last_n_api_error():
-    """Test getting last N gold prices when API returns error."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=None)):
-        result = await get_gold_price_last_n(10)
+    assert "Unable to fetch gold price history" in result
 
-    assert "Unable to fetch last 10 gold prices" in result
 
+async def test_get_gold_price_history_empty_data(mock_nbp):
+    """Test getting gold price history when no data is available."""
+    mock_nbp.return_value = []
 
-@pytest.mark.asyncio
-async def test_get_gold_price_last_n_empty_data():
-    """Test getting last N gold prices when no data is available."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=[])):
-        result = await get_gold_price_last_n(10)
+    result = await get_gold_price_history("2024-01-01", "2024-01-31")
 
     assert "No gold price data available" in result
 
 
-@pytest.mark.asyncio
-async def test_get_gold_price_last_n_single_price():
-    """Test getting single gold price using last N."""
-    mock_response = [
-        {
-            "data": "2024-01-02",
-            "cena": 245.67
-        }
-    ]
+GOLD_LAST_N_CASES = [
+    pytest.param(
+        GOLD_LAST_3,
+        3,
+        ("Last 3 Gold Prices", "Date: 2024-01-04", "Price: 245.89 PLN/g",
+         "Date: 2024-01-03", "Date: 2024-01-02"),
+        id="success",
+    ),
+    pytest.param(None, 10, ("Unable to fetch last 10 gold prices",), id="api_error"),
+    pytest.param([], 10, ("No gold price data available",), id="empty_data"),
+    pytest.param(
+        GOLD_ONE,
+        1,
+        ("Last 1 Gold Prices", "Date: 2024-01-02", "Price: 245.67 PLN/g"),
+        id="single_price",
+    ),
+]
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_gold_price_last_n(1)
 
-    assert "Last 1 Gold Prices" in result
-    assert "Date: 2024-01-02" in result
-    assert "Price: 245.67 PLN/g" in result
+@pytest.mark.parametrize("payload,count,expected", GOLD_LAST_N_CASES)
+async def test_get_gold_price_last_n(mock_nbp, payload, count, expected):
+    """Test getting last N gold prices for various API responses."""
+    mock_nbp.return_value = payload
+
+    result = await get_gold_price_last_n(count)
+
+    assert_all_in(result, *expected)
+
 
+@pytest.mark.parametrize("count", [0, 256, -5])
+async def test_get_gold_price_last_n_invalid_count(count):
+    """Test getting last N gold prices with invalid count."""
+    result = await get_gold_price_last_n(count)
+    assert "Count must be between 1 and 255" in result
 
-@pytest.mark.asyncio
-async def test_get_gold_price_with_date():
+
+async def test_get_gold_price_with_date(mock_nbp):
     """Test getting gold price for a specific date."""
-    mock_response = [
-        {
-            "data": "2024-01-15",
-            "cena": 248.50
-        }
-    ]
+    mock_nbp.return_value = GOLD_DATED
 
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=mock_response)):
-        result = await get_gold_price(date="2024-01-15")
+    result = await get_gold_price(date="2024-01-15")
 
     assert "Date: 2024-01-15" in result
     assert "Price: 248.5 PLN/g" in result
 
 
-@pytest.mark.asyncio
-async def test_get_gold_price_invalid_date_format():
+@pytest.mark.parametrize("date", ["01-15-2024", "2024/01/15", "15.01.2024"])
+async def test_get_gold_price_invalid_date_format(date):
     """Test getting gold price with invalid date format."""
-    result = await get_gold_price(date="01-15-2024")
+    result = await get_gold_price(date=date)
     assert "Invalid date format" in result
     assert "YYYY-MM-DD" in result
 
-    result = await get_gold_price(date="2024/01/15")
-    assert "Invalid date format" in result
-
-    result = await get_gold_price(date="15.01.2024")
-    assert "Invalid date format" in result
-
 
-@pytest.mark.asyncio
-async def test_get_gold_price_date_not_found():
+async def test_get_gold_price_date_not_found(mock_nbp):
     """Test getting gold price when date has no data (weekend/holiday)."""
-    with patch("src.nbp.make_nbp_request", new=AsyncMock(return_value=None)):
-        result = await get_gold_price(date="2024-01-01")
+    mock_nbp.return_value = None
+
+    result = await get_gold_price(date="2024-01-01")
 
     assert "Unable to fetch gold price" in result
     assert "2024-01-01" in result
@@ -1,320 +1,682 @@
 """Tests for helper functions."""
 import pytest
 import httpx
-from unittest.mock import AsyncMock, patch, MagicMock
+import asyncio
+import datetime
+from unittest.mock import AsyncMock, patch
+from tests.utils import assert_all_in
+from src import nbp
 from src.nbp import (
+    cache_ttl,
     make_nbp_request,
     format_rate,
     format_exchange_table,
     format_gold_price,
+    format_rate_entries,
+    split_date_range,
+    validate_date,
 )
 
 
-@pytest.mark.asyncio
-async def test_make_nbp_request_success():
-    """Test making successful NBP API request."""
-    mock_response = MagicMock()
-    mock_response.json.return_value = {"test": "data"}
-    mock_response.raise_for_status = MagicMock()
+def test_validate_date_valid():
+    """Test validating well-formed and empty dates."""
+    assert validate_date("2024-01-15") is None
+    assert validate_date("") is None
 
-    mock_client = AsyncMock()
-    mock_client.get.return_value = mock_response
 
-    with patch("httpx.AsyncClient") as mock_async_client:
-        mock_async_client.return_value.__aenter__.return_value = mock_client
+def test_validate_date_invalid():
+    """Test validating malformed dates."""
+    for date in ["01-15-2024", "2024/01/15", "15.01.2024", "2024-1-15", "2024-01-15\n", "2024-01-1a"]:
+        result = validate_date(date)
+        assert result is not None
+        assert "Invalid date format" in result
+
+
+async def test_make_nbp_request_success(mock_transport):
+    """Test making successful NBP API request."""
+    requests = mock_transport(lambda request: httpx.Response(200, json={"test": "data"}))
 
-        result = await make_nbp_request("https://api.nbp.pl/api/test")
+    result = await make_nbp_request("https://api.nbp.pl/api/test")
 
     assert result == {"test": "data"}
-    mock_client.get.assert_called_once()
-    call_args = mock_client.get.call_args
-    assert call_args[0][0] == "https://api.nbp.pl/api/test"
-    assert call_args[1]["headers"]["User-Agent"] == "nbp-mcp-server/1.0"
-    assert call_args[1]["headers"]["Accept"] == "application/json"
+    assert len(requests) == 1
+    assert requests[0].url == "https://api.nbp.pl/api/test"
+    assert requests[0].headers["User-Agent"] == "nbp-mcp-server/1.0"
+    assert requests[0].headers["Accept"] == "application/json"
 
 
-@pytest.mark.asyncio
-async def test_make_nbp_request_http_error():
+async def test_make_nbp_request_http_error(mock_transport):
     """Test making NBP API request with HTTP error."""
-    mock_client = AsyncMock()
-    mock_client.get.side_effect = httpx.HTTPStatusError(
-        "Not Found", request=MagicMock(), response=MagicMock()
-    )
-
-    with patch("httpx.AsyncClient") as mock_async_client:
-        mock_async_client.return_value.__aenter__.return_value = mock_client
+    requests = mock_transport(lambda request: httpx.Response(404, text="Not Found"))
 
-        result = await make_nbp_request("https://api.nbp.pl/api/test")
+    result = await make_nbp_request("https://api.nbp.pl/api/test")
 
     assert result is None
+    assert len(requests) == 1
 
 
-@pytest.mark.asyncio
-async def test_make_nbp_request_timeout():
+async def test_make_nbp_request_timeout(mock_transport, monkeypatch):
     """Test making NBP API request with timeout."""
-    mock_client = AsyncMock()
-    mock_client.get.side_effect = httpx.TimeoutException("Timeout")
+    monkeypatch.setattr(nbp, "RETRY_BACKOFF", 0)
 
-    with patch("httpx.AsyncClient") as mock_async_client:
-        mock_async_client.return_value.__aenter__.return_value = mock_client
+    def handler(request):
+        raise httpx.TimeoutException("Timeout", request=request)
 
-        result = await make_nbp_request("https://api.nbp.pl/api/test")
+    requests = mock_transport(handler)
+
+    result = await make_nbp_request("https://api.nbp.pl/api/test")
 
     assert result is None
+    assert len(requests) == nbp.RETRY_ATTEMPTS
 
 
-@pytest.mark.asyncio
-async def test_make_nbp_request_network_error():
+async def test_make_nbp_request_network_error(mock_transport, monkeypatch):
     """Test making NBP API request with network error."""
-    mock_client = AsyncMock()
-    mock_client.get.side_effect = httpx.NetworkError("Network error")
+    monkeypatch.setattr(nbp, "RETRY_BACKOFF", 0)
 
-    with patch("httpx.AsyncClient") as mock_async_client:
-        mock_async_client.return_value.__aenter__.return_value = mock_client
+    def handler(request):
+        raise httpx.NetworkError("Network error", request=request)
 
-        result = await make_nbp_request("https://api.nbp.pl/api/test")
+    requests = mock_transport(handler)
+
+    result = await make_nbp_request("https://api.nbp.pl/api/test")
 
     assert result is None
+    assert len(requests) == nbp.RETRY_ATTEMPTS
 
 
-def test_format_rate_with_mid():
-    """Test formatting rate with mid value."""
-    rate = {
-        "currency": "dolar amerykański",
-        "code": "USD",
-        "mid": 3.9876
-    }
+async def test_make_nbp_request_retries_server_error(mock_transport, monkeypatch):
+    """Test that transient server errors are retried."""
+    monkeypatch.setattr(nbp, "RETRY_BACKOFF", 0)
+    outcomes = iter([
+        httpx.Response(503),
+        httpx.ConnectError("Refused"),
+        httpx.Response(200, json={"test": "data"}),
+    ])
 
-    result = format_rate(rate)
+    def handler(request):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
 
-    assert "Currency: dolar amerykański" in result
-    assert "Code: USD" in result
-    assert "Mid Rate: 3.9876" in result
-    assert "Bid Rate" not in result
-    assert "Ask Rate" not in result
+    requests = mock_transport(handler)
 
+    result = await make_nbp_request("https://api.nbp.pl/api/test")
 
-def test_format_rate_with_bid_ask():
-    """Test formatting rate with bid and ask values."""
-    rate = {
-        "currency": "euro",
-        "code": "EUR",
-        "bid": 4.3000,
-        "ask": 4.3900
-    }
+    assert result == {"test": "data"}
+    assert len(requests) == 3
 
-    result = format_rate(rate)
 
-    assert "Currency: euro" in result
-    assert "Code: EUR" in result
-    assert "Bid Rate: 4.3" in result
-    assert "Ask Rate: 4.39" in result
-    assert "Mid Rate" not in result
-
-
-def test_format_rate_all_fields():
-    """Test formatting rate with all possible fields."""
-    rate = {
-        "currency": "funt szterling",
-        "code": "GBP",
-        "mid": 5.1234,
-        "bid": 5.1000,
-        "ask": 5.2000
-    }
+async def test_make_nbp_request_rate_limited(mock_transport, monkeypatch):
+    """Test giving up after repeated rate limiting."""
+    monkeypatch.setattr(nbp, "RETRY_BACKOFF", 0)
+    requests = mock_transport(lambda request: httpx.Response(429))
 
-    result = format_rate(rate)
+    result = await make_nbp_request("https://api.nbp.pl/api/test")
 
-    assert "Currency: funt szterling" in result
-    assert "Code: GBP" in result
-    assert "Mid Rate: 5.1234" in result
-    assert "Bid Rate: 5.1" in result
-    assert "Ask Rate: 5.2" in result
+    assert result is None
+    assert len(requests) == nbp.RETRY_ATTEMPTS
 
 
-def test_format_rate_missing_fields():
-    """Test formatting rate with missing fields."""
-    rate = {}
+async def test_make_nbp_request_retries_protocol_error(mock_transport, monkeypatch):
+    """Test that a dropped connection is retried."""
+    monkeypatch.setattr(nbp, "RETRY_BACKOFF", 0)
+    outcomes = iter([
+        httpx.RemoteProtocolError("Server disconnected"),
+        httpx.Response(200, json={"test": "data"}),
+    ])
 
-    result = format_rate(rate)
+    def handler(request):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
 
-    assert "Currency: Unknown" in result
-    assert "Code: Unknown" in result
+    requests = mock_transport(handler)
 
+    assert await make_nbp_request("https://api.nbp.pl/api/test") == {"test": "data"}
+    assert len(requests) == 2
 
-def test_format_rate_with_country():
-    """Test formatting rate with country field."""
-    rate = {
-        "currency": "dolar amerykański",
-        "code": "USD",
-        "country": "Stany Zjednoczone",
-        "mid": 3.9876
-    }
 
-    result = format_rate(rate)
+async def test_make_nbp_request_permanent_transport_error(mock_transport):
+    """Test that transport errors that cannot succeed on retry fail immediately."""
+    def handler(request):
+        raise httpx.ProxyError("Proxy refused")
 
-    assert "Currency: dolar amerykański" in result
-    assert "Code: USD" in result
-    assert "Country: Stany Zjednoczone" in result
-    assert "Mid Rate: 3.9876" in result
+    requests = mock_transport(handler)
 
+    result = await make_nbp_request("https://api.nbp.pl/api/test")
 
-def test_format_rate_with_symbol():
-    """Test formatting rate with symbol field (for archived rates)."""
-    rate = {
-        "currency": "dolar amerykański",
-        "code": "USD",
-        "symbol": "840",
-        "mid": 3.9876
-    }
+    assert result is None
+    assert len(requests) == 1
 
-    result = format_rate(rate)
 
-    assert "Currency: dolar amerykański" in result
-    assert "Code: USD" in result
-    assert "Symbol: 840" in result
-    assert "Mid Rate: 3.9876" in result
+async def test_make_nbp_request_honours_retry_after(mock_transport, monkeypatch):
+    """Test that a Retry-After delay replaces the backoff."""
+    monkeypatch.setattr(nbp, "RETRY_BACKOFF", 60)
+    outcomes = iter([
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(200, json={"test": "data"}),
+    ])
+    requests = mock_transport(lambda request: next(outcomes))
 
+    result = await asyncio.wait_for(make_nbp_request("https://api.nbp.pl/api/test"), 1)
 
-def test_format_rate_with_country_and_symbol():
-    """Test formatting rate with both country and symbol fields."""
-    rate = {
-        "currency": "dolar amerykański",
-        "code": "USD",
-        "country": "Stany Zjednoczone",
-        "symbol": "840",
-        "mid": 3.9876
-    }
+    assert result == {"test": "data"}
+    assert len(requests) == 2
 
-    result = format_rate(rate)
 
-    assert "Currency: dolar amerykański" in result
-    assert "Code: USD" in result
-    assert "Country: Stany Zjednoczone" in result
-    assert "Symbol: 840" in result
-    assert "Mid Rate: 3.9876" in result
+async def test_make_nbp_request_long_retry_after(mock_transport):
+    """Test giving up when Retry-After asks to wait too long."""
+    requests = mock_transport(lambda request: httpx.Response(503, headers={"Retry-After": "3600"}))
 
+    result = await make_nbp_request("https://api.nbp.pl/api/test")
 
-def test_format_exchange_table_table_a():
-    """Test formatting exchange table type A."""
-    table = {
-        "table": "A",
-        "no": "001/A/NBP/2024",
-        "effectiveDate": "2024-01-02",
-        "rates": [
-            {
-                "currency": "dolar amerykański",
-                "code": "USD",
-                "mid": 3.9876
-            },
-            {
-                "currency": "euro",
-                "code": "EUR",
-                "mid": 4.3215
-            }
-        ]
-    }
+    assert result is None
+    assert len(requests) == 1
 
-    result = format_exchange_table(table)
 
-    assert "Table: A" in result
-    assert "Number: 001/A/NBP/2024" in result
-    assert "Effective Date: 2024-01-02" in result
-    assert "Currency: dolar amerykański" in result
-    assert "Code: USD" in result
-    assert "Mid Rate: 3.9876" in result
-    assert "Currency: euro" in result
-    assert "Code: EUR" in result
-    assert "Mid Rate: 4.3215" in result
+def test_retry_after_http_date():
+    """Test parsing Retry-After given as an HTTP date."""
+    past = httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    invalid = httpx.Response(429, headers={"Retry-After": "soon"})
 
+    assert nbp._retry_after(past) == 0.0
+    assert nbp._retry_after(invalid) is None
+    assert nbp._retry_after(httpx.Response(429)) is None
 
-def test_format_exchange_table_table_c():
-    """Test formatting exchange table type C with trading date."""
-    table = {
-        "table": "C",
-        "no": "001/C/NBP/2024",
-        "tradingDate": "2024-01-02",
-        "effectiveDate": "2024-01-03",
-        "rates": [
-            {
-                "currency": "dolar amerykański",
-                "code": "USD",
-                "bid": 3.9500,
-                "ask": 4.0250
-            }
-        ]
-    }
 
-    result = format_exchange_table(table)
+async def test_make_nbp_request_invalid_json(mock_transport):
+    """Test making NBP API request that returns a non-JSON body."""
+    mock_transport(lambda request: httpx.Response(200, text="404 NotFound - Not Found - Brak danych"))
 
-    assert "Table: C" in result
-    assert "Number: 001/C/NBP/2024" in result
-    assert "Trading Date: 2024-01-02" in result
-    assert "Effective Date: 2024-01-03" in result
-    assert "Bid Rate: 3.95" in result
-    assert "Ask Rate: 4.025" in result
+    result = await make_nbp_request("https://api.nbp.pl/api/test")
 
+    assert result is None
 
-def test_format_exchange_table_empty_rates():
-    """Test formatting exchange table with empty rates."""
-    table = {
-        "table": "A",
-        "no": "001/A/NBP/2024",
-        "effectiveDate": "2024-01-02",
-        "rates": []
-    }
 
-    result = format_exchange_table(table)
+async def test_make_nbp_request_strict(mock_transport, monkeypatch):
+    """Test that strict requests raise on failures but not on missing data."""
+    monkeypatch.setattr(nbp, "RETRY_BACKOFF", 0)
+    mock_transport(
+        lambda request: httpx.Response(404 if request.url.path.endswith("/missing/") else 503)
+    )
 
-    assert "Table: A" in result
-    assert "Number: 001/A/NBP/2024" in result
-    assert "Effective Date: 2024-01-02" in result
-    assert "Rates:" in result
+    assert await make_nbp_request("https://api.nbp.pl/api/missing/", strict=True) is None
+    with pytest.raises(nbp.NBPRequestError):
+        await make_nbp_request("https://api.nbp.pl/api/down/", strict=True)
 
 
-def test_format_exchange_table_missing_fields():
-    """Test formatting exchange table with missing fields."""
-    table = {
-        "rates": []
-    }
+async def test_make_nbp_request_caches_success():
+    """Test that successful responses are served from cache."""
+    fetch = AsyncMock(return_value={"test": "data"})
 
-    result = format_exchange_table(table)
+    with patch("src.nbp._fetch", new=fetch):
+        first = await make_nbp_request("https://api.nbp.pl/api/test")
+        second = await make_nbp_request("https://api.nbp.pl/api/test")
 
-    assert "Table: Unknown" in result
-    assert "Number: Unknown" in result
-    assert "Effective Date: Unknown" in result
+    assert first == second == {"test": "data"}
+    fetch.assert_called_once()
 
 
-def test_format_gold_price():
-    """Test formatting gold price data."""
-    gold = {
-        "data": "2024-01-02",
-        "cena": 245.67
-    }
+async def test_make_nbp_request_does_not_cache_failure():
+    """Test that failed requests are retried on the next call."""
+    fetch = AsyncMock(side_effect=[None, {"test": "data"}])
+
+    with patch("src.nbp._fetch", new=fetch):
+        assert await make_nbp_request("https://api.nbp.pl/api/test") is None
+        assert await make_nbp_request("https://api.nbp.pl/api/test") == {"test": "data"}
+
+    assert fetch.call_count == 2
+
+
+async def test_make_nbp_request_expired_entry(monkeypatch):
+    """Test that expired cache entries are fetched again."""
+    fetch = AsyncMock(return_value={"test": "data"})
+    url = "https://api.nbp.pl/api/cenyzlota/"
+    monkeypatch.setitem(nbp._CACHE, url, (0.0, {"stale": "data"}))
+    monkeypatch.setattr(nbp.time, "monotonic", lambda: 1.0)
+
+    with patch("src.nbp._fetch", new=fetch):
+        result = await make_nbp_request(url)
+
+    assert result == {"test": "data"}
+    fetch.assert_called_once()
+
+
+async def test_make_nbp_request_single_flight():
+    """Test that concurrent requests for the same URL share one fetch."""
+    async def slow_fetch(url):
+        await asyncio.sleep(0.01)
+        return {"test": "data"}
+
+    fetch = AsyncMock(side_effect=slow_fetch)
+
+    with patch("src.nbp._fetch", new=fetch):
+        results = await asyncio.gather(
+            *(make_nbp_request("https://api.nbp.pl/api/test") for _ in range(5))
+        )
+
+    assert results == [{"test": "data"}] * 5
+    fetch.assert_called_once()
 
-    result = format_gold_price(gold)
 
-    assert "Date: 2024-01-02" in result
-    assert "Price: 245.67 PLN/g" in result
+async def test_make_nbp_request_releases_locks():
+    """Test that per-URL locks are dropped once no request uses them."""
+    async def slow_fetch(url):
+        await asyncio.sleep(0.01)
+        return None
 
+    with patch("src.nbp._fetch", new=AsyncMock(side_effect=slow_fetch)):
+        pending = asyncio.gather(
+            *(make_nbp_request("https://api.nbp.pl/api/test") for _ in range(3))
+        )
+        await asyncio.sleep(0)
+        assert nbp._LOCKS["https://api.nbp.pl/api/test"][1] == 3
+        await pending
 
-def test_format_gold_price_missing_fields():
-    """Test formatting gold price with missing fields."""
-    gold = {}
+    assert nbp._LOCKS == {}
 
-    result = format_gold_price(gold)
 
-    assert "Date: Unknown" in result
-    assert "Price: Unknown PLN/g" in result
+async def test_make_nbp_request_evicts_oldest(monkeypatch):
+    """Test that the cache drops its oldest entry when full."""
+    monkeypatch.setattr(nbp, "CACHE_MAX_ENTRIES", 2)
+    base = "https://api.nbp.pl/api/test"
 
+    with patch("src.nbp._fetch", new=AsyncMock(return_value={"test": "data"})):
+        for path in ("a", "b", "c"):
+            await make_nbp_request(f"{base}/{path}/")
 
-def test_format_gold_price_high_precision():
-    """Test formatting gold price with high precision number."""
-    gold = {
-        "data": "2024-01-02",
-        "cena": 245.6789
+    assert list(nbp._CACHE) == [f"{base}/b/", f"{base}/c/"]
+
+
+def test_split_date_range_within_limit():
+    """Test that ranges within the limit are returned unchanged."""
+    assert split_date_range("2024-01-01", "2024-01-31", 93) == [("2024-01-01", "2024-01-31")]
+    assert split_date_range("2024-01-01", "2024-04-02", 93) == [("2024-01-01", "2024-04-02")]
+
+
+def test_split_date_range_long_range():
+    """Test splitting a range longer than the limit into windows."""
+    windows = split_date_range("2024-01-01", "2024-12-31", 93)
+
+    assert windows == [
+        ("2024-01-01", "2024-04-02"),
+        ("2024-04-03", "2024-07-04"),
+        ("2024-07-05", "2024-10-05"),
+        ("2024-10-06", "2024-12-31"),
+    ]
+
+
+def test_split_date_range_invalid_dates():
+    """Test that unparseable ranges are passed through for the API to reject."""
+    assert split_date_range("2024-13-01", "2025-12-31", 93) == [("2024-13-01", "2025-12-31")]
+    assert split_date_range("yesterday", "today", 93) == [("yesterday", "today")]
+
+
+def test_split_date_range_clamps_to_available_data():
+    """Test that ranges are clamped to the first data date and today."""
+    today = datetime.date.today()
+
+    windows = split_date_range("1000-01-01", "9999-12-31", 367, nbp.GOLD_FIRST_DATE)
+
+    assert windows[0][0] == "2013-01-02"
+    assert windows[-1][1] == today.isoformat()
+    assert len(windows) == (today - nbp.GOLD_FIRST_DATE).days // 367 + 1
+
+
+def test_split_date_range_outside_available_data():
+    """Test that ranges with no days left after clamping are passed through."""
+    assert split_date_range("2001-01-01", "2001-12-31", 93, nbp.RATES_FIRST_DATE) == [
+        ("2001-01-01", "2001-12-31")
+    ]
+    assert split_date_range("9999-01-01", "9999-01-31", 93) == [("9999-01-01", "9999-01-31")]
+
+
+def test_build_rate_url():
+    """Test building and validating single rate URLs."""
+    base = "https://api.nbp.pl/api/exchangerates/rates"
+
+    assert nbp._build_rate_url("USD", "a", "") == (f"{base}/a/USD/", None)
+    assert nbp._build_rate_url("USD", "c", "2024-01-15") == (f"{base}/c/USD/2024-01-15/", None)
+    assert nbp._build_rate_url("USD", "x", "") == (None, nbp.INVALID_TABLE_ERROR)
+
+    url, error = nbp._build_rate_url("USD", "a", "15.01.2024")
+    assert url is None
+    assert "Invalid date format" in error
+
+
+def test_build_history_urls_splits_range():
+    """Test that history URLs are built per API-sized window."""
+    urls, error = nbp._build_history_urls("EUR", "a", "2024-01-01", "2024-05-31")
+
+    assert error is None
+    assert urls == (
+        "https://api.nbp.pl/api/exchangerates/rates/a/EUR/2024-01-01/2024-04-02/",
+        "https://api.nbp.pl/api/exchangerates/rates/a/EUR/2024-04-03/2024-05-31/",
+    )
+
+
+def test_build_history_urls_rejects_long_range():
+    """Test that ranges needing too many windows are rejected."""
+    urls, error = nbp._build_history_urls("USD", "a", "1000-01-01", "9999-12-31")
+
+    assert urls == ()
+    assert error == nbp.RANGE_TOO_LONG_ERROR.format(
+        days=nbp.MAX_RANGE_WINDOWS * nbp.MAX_RATES_RANGE_DAYS
+    )
+
+
+def test_build_last_n_url_is_memoized():
+    """Test that repeated URL builds are served from the memo cache."""
+    nbp._build_last_n_url.cache_clear()
+
+    first = nbp._build_last_n_url("USD", "a", 10)
+    second = nbp._build_last_n_url("USD", "a", 10)
+
+    assert first == ("https://api.nbp.pl/api/exchangerates/rates/a/USD/last/10/", None)
+    assert second is first
+    assert nbp._build_last_n_url.cache_info().hits == 1
+    assert nbp._build_last_n_url("USD", "a", 0) == (None, nbp.INVALID_COUNT_ERROR)
+
+
+def test_cache_ttl():
+    """Test cache lifetime classification of NBP API URLs."""
+    base = "https://api.nbp.pl/api"
+
+    assert cache_ttl(f"{base}/exchangerates/rates/a/USD/") == nbp.TTL_CURRENT
+    assert cache_ttl(f"{base}/exchangerates/tables/a/") == nbp.TTL_CURRENT
+    assert cache_ttl(f"{base}/cenyzlota/") == nbp.TTL_CURRENT
+    assert cache_ttl(f"{base}/cenyzlota/last/10/") == nbp.TTL_CURRENT
+    assert cache_ttl(f"{base}/exchangerates/rates/a/USD/2024-01-15/") == nbp.TTL_HISTORICAL
+    assert cache_ttl(f"{base}/cenyzlota/2024-01-01/2024-01-31/") == nbp.TTL_HISTORICAL
+
+
+def test_cache_ttl_range_ending_today_or_later():
+    """Test that URLs whose last date is not yet in the past count as current."""
+    base = "https://api.nbp.pl/api"
+    today = datetime.date.today()
+    tomorrow = today + datetime.timedelta(days=1)
+
+    assert cache_ttl(f"{base}/exchangerates/rates/a/USD/{today}/") == nbp.TTL_CURRENT
+    assert cache_ttl(f"{base}/exchangerates/rates/a/USD/2024-01-01/{today}/") == nbp.TTL_CURRENT
+    assert cache_ttl(f"{base}/cenyzlota/2024-01-01/{tomorrow}/") == nbp.TTL_CURRENT
+
+
+async def test_get_client_reuses_instance(monkeypatch):
+    """Test that the shared client is created once with default headers."""
+    monkeypatch.setattr(nbp, "_CLIENT", None)
+
+    client = await nbp._get_client()
+    try:
+        assert await nbp._get_client() is client
+        assert client.headers["User-Agent"] == "nbp-mcp-server/1.0"
+        assert client.headers["Accept"] == "application/json"
+    finally:
+        await client.aclose()
+
+
+async def test_get_client_enables_http2(monkeypatch):
+    """Test that the shared client is configured for HTTP/2."""
+    monkeypatch.setattr(nbp, "_CLIENT", None)
+
+    with patch("httpx.AsyncClient") as mock_async_client:
+        await nbp._get_client()
+
+    assert mock_async_client.call_args.kwargs["http2"] is True
+
+
+async def test_lifespan_closes_client(monkeypatch):
+    """Test that the shared client is closed when the server shuts down."""
+    monkeypatch.setattr(nbp, "_CLIENT", None)
+
+    async with nbp._lifespan(nbp.mcp):
+        client = await nbp._get_client()
+
+    assert client.is_closed
+    assert nbp._CLIENT is None
+
+
+FORMAT_RATE_CASES = [
+    pytest.param(
+        {"currency": "dolar amerykański", "code": "USD", "mid": 3.9876},
+        ("Currency: dolar amerykański", "Code: USD", "Mid Rate: 3.9876"),
+        ("Bid Rate", "Ask Rate"),
+        id="mid",
+    ),
+    pytest.param(
+        {"currency": "euro", "code": "EUR", "bid": 4.3000, "ask": 4.3900},
+        ("Currency: euro", "Code: EUR", "Bid Rate: 4.3", "Ask Rate: 4.39"),
+        ("Mid Rate",),
+        id="bid_ask",
+    ),
+    pytest.param(
+        {"currency": "funt szterling", "code": "GBP", "mid": 5.1234, "bid": 5.1000, "ask": 5.2000},
+        ("Currency: funt szterling", "Code: GBP", "Mid Rate: 5.1234", "Bid Rate: 5.1", "Ask Rate: 5.2"),
+        (),
+        id="all_fields",
+    ),
+    pytest.param(
+        {},
+        ("Currency: Unknown", "Code: Unknown"),
+        (),
+        id="missing_fields",
+    ),
+    pytest.param(
+        {"currency": "dolar amerykański", "code": "USD", "country": "Stany Zjednoczone", "mid": 3.9876},
+        ("Currency: dolar amerykański", "Code: USD", "Country: Stany Zjednoczone", "Mid Rate: 3.9876"),
+        ("Symbol",),
+        id="country",
+    ),
+    pytest.param(
+        # Symbol is present for archived rates
+        {"currency": "dolar amerykański", "code": "USD", "symbol": "840", "mid": 3.9876},
+        ("Currency: dolar amerykański", "Code: USD", "Symbol: 840", "Mid Rate: 3.9876"),
+        ("Country",),
+        id="symbol",
+    ),
+    pytest.param(
+        {
+            "currency": "dolar amerykański",
+            "code": "USD",
+            "country": "Stany Zjednoczone",
+            "symbol": "840",
+            "mid": 3.9876
+        },
+        (
+            "Currency: dolar amerykański",
+            "Code: USD",
+            "Country: Stany Zjednoczone",
+            "Symbol: 840",
+            "Mid Rate: 3.9876",
+        ),
+        (),
+        id="country_and_symbol",
+    ),
+]
+
+
+@pytest.mark.parametrize("rate,expected,absent", FORMAT_RATE_CASES)
+def test_format_rate(rate, expected, absent):
+    """Test formatting a currency rate."""
+    result = format_rate(rate)
+
+    assert_all_in(result, *expected)
+    for text in absent:
+        assert text not in result
+
+
+def test_format_rate_entries_mid():
+    """Test formatting a series of mid rate entries."""
+    rates = [
+        {"no": "001/A/NBP/2024", "effectiveDate": "2024-01-02", "mid": 3.9876},
+        {"no": "002/A/NBP/2024", "effectiveDate": "2024-01-03", "mid": 3.9912},
+    ]
+
+    result = format_rate_entries(rates)
+
+    assert result == (
+        "Date: 2024-01-02 | Mid Rate: 3.9876 PLN\n"
+        "Date: 2024-01-03 | Mid Rate: 3.9912 PLN"
+    )
+
+
+def test_format_rate_entries_bid_ask():
+    """Test formatting a series of bid/ask rate entries with trading dates."""
+    rates = [
+        {
+            "effectiveDate": "2024-01-03",
+            "tradingDate": "2024-01-02",
+            "bid": 3.95,
+            "ask": 4.025
+        },
+    ]
+
+    result = format_rate_entries(rates)
+
+    assert result == (
+        "Date: 2024-01-03 | Trading Date: 2024-01-02 | "
+        "Bid Rate: 3.95 PLN | Ask Rate: 4.025 PLN"
+    )
+
+
+def test_format_rate_entries_mixed_fields():
+    """Test formatting entries whose fields differ from the first entry."""
+    rates = [
+        {"effectiveDate": "2024-01-02", "mid": 3.9876},
+        {"effectiveDate": "2024-01-03", "bid": 3.95, "ask": 4.025},
+        {"mid": 3.9912},
+    ]
+
+    result = format_rate_entries(rates)
+
+    assert result.splitlines() == [
+        "Date: 2024-01-02 | Mid Rate: 3.9876 PLN",
+        "Date: 2024-01-03 | Bid Rate: 3.95 PLN | Ask Rate: 4.025 PLN",
+        "Date: Unknown | Mid Rate: 3.9912 PLN",
+    ]
+
+
+def test_format_rate_entries_extra_fields():
+    """Test formatting entries with more fields than the first entry."""
+    rates = [
+        {"effectiveDate": "2024-01-02", "mid": 3.9876},
+        {"effectiveDate": "2024-01-03", "mid": 3.9912, "tradingDate": "2024-01-02"},
+    ]
+
+    result = format_rate_entries(rates)
+
+    assert result.splitlines() == [
+        "Date: 2024-01-02 | Mid Rate: 3.9876 PLN",
+        "Date: 2024-01-03 | Trading Date: 2024-01-02 | Mid Rate: 3.9912 PLN",
+    ]
+
+
+FORMAT_EXCHANGE_TABLE_CASES = [
+    pytest.param(
+        {
+            "table": "A",
+            "no": "001/A/NBP/2024",
+            "effectiveDate": "2024-01-02",
+            "rates": [
+                {"currency": "dolar amerykański", "code": "USD", "mid": 3.9876},
+                {"currency": "euro", "code": "EUR", "mid": 4.3215}
+            ]
+        },
+        (
+            "Table: A",
+            "Number: 001/A/NBP/2024",
+            "Effective Date: 2024-01-02",
+            "Currency: dolar amerykański",
+            "Code: USD",
+            "Mid Rate: 3.9876",
+            "Currency: euro",
+            "Code: EUR",
+            "Mid Rate: 4.3215",
+        ),
+        id="table_a",
+    ),
+    pytest.param(
+        {
+            "table": "C",
+            "no": "001/C/NBP/2024",
+            "tradingDate": "2024-01-02",
+            "effectiveDate": "2024-01-03",
+            "rates": [
+                {"currency": "dolar amerykański", "code": "USD", "bid": 3.9500, "ask": 4.0250}
+            ]
+        },
+        (
+            "Table: C",
+            "Number: 001/C/NBP/2024",
+            "Trading Date: 2024-01-02",
+            "Effective Date: 2024-01-03",
+            "Bid Rate: 3.95",
+            "Ask Rate: 4.025",
+        ),
+        id="table_c",
+    ),
+    pytest.param(
+        {"table": "A", "no": "001/A/NBP/2024", "effectiveDate": "2024-01-02", "rates": []},
+        ("Table: A", "Number: 001/A/NBP/2024", "Effective Date: 2024-01-02", "Rates:"),
+        id="empty_rates",
+    ),
+    pytest.param(
+        {"rates": []},
+        ("Table: Unknown", "Number: Unknown", "Effective Date: Unknown"),
+        id="missing_fields",
+    ),
+]
+
+
+@pytest.mark.parametrize("table,expected", FORMAT_EXCHANGE_TABLE_CASES)
+def test_format_exchange_table(table, expected):
+    """Test formatting an exchange rate table."""
+    assert_all_in(format_exchange_table(table), *expected)
+
+
+def test_format_exchange_table_mixed_rate_fields():
+    """Test formatting exchange table whose rates have different fields."""
+    table = {
+        "table": "A",
+        "no": "001/A/NBP/2024",
+        "effectiveDate": "2024-01-02",
+        "rates": [
+            {"currency": "dolar amerykański", "code": "USD", "mid": 3.9876},
+            {"currency": "euro", "code": "EUR", "country": "EMU", "symbol": "978", "mid": 4.3215},
+        ]
     }
 
-    result = format_gold_price(gold)
+    result = format_exchange_table(table)
+
+    assert result.endswith(
+        "Rates:\n\n"
+        "Currency: dolar amerykański\nCode: USD\nMid Rate: 3.9876\n\n"
+        "Currency: euro\nCode: EUR\nCountry: EMU\nSymbol: 978\nMid Rate: 4.3215"
+    )
+
 
-    assert "Date: 2024-01-02" in result
-    assert "Price: 245.6789 PLN/g" in result
+FORMAT_GOLD_PRICE_CASES = [
+    pytest.param(
+        {"data": "2024-01-02", "cena": 245.67},
+        ("Date: 2024-01-02", "Price: 245.67 PLN/g"),
+        id="price",
+    ),
+    pytest.param(
+        {},
+        ("Date: Unknown", "Price: Unknown PLN/g"),
+        id="missing_fields",
+    ),
+    pytest.param(
+        {"data": "2024-01-02", "cena": 245.6789},
+        ("Date: 2024-01-02", "Price: 245.6789 PLN/g"),
+        id="high_precision",
+    ),
+]
+
+
+@pytest.mark.parametrize("gold,expected", FORMAT_GOLD_PRICE_CASES)
+def test_format_gold_price(gold, expected):
+    """Test formatting gold price data."""
+    assert_all_in(format_gold_price(gold), *expected)
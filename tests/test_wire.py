@@ -0,0 +1,59 @@
+"""Tests for the MessagePack stdio transport."""
+import io
+import anyio
+import msgspec
+import mcp.types as types
+from mcp.shared.message import SessionMessage
+from src.wire import (
+    encode_frame,
+    read_frame,
+    msgpack_stdio_server,
+)
+
+
+def test_encode_frame():
+    """Test encoding a message as a length-prefixed frame."""
+    frame = encode_frame({"jsonrpc": "2.0", "id": 1, "method": "ping"})
+
+    size = int.from_bytes(frame[:4], "big")
+    assert size == len(frame) - 4
+    assert msgspec.msgpack.decode(frame[4:]) == {"jsonrpc": "2.0", "id": 1, "method": "ping"}
+
+
+async def test_read_frame():
+    """Test reading consecutive frames until end of stream."""
+    stream = anyio.wrap_file(io.BytesIO(encode_frame({"a": 1}) + encode_frame([1, 2])))
+
+    assert msgspec.msgpack.decode(await read_frame(stream)) == {"a": 1}
+    assert msgspec.msgpack.decode(await read_frame(stream)) == [1, 2]
+    assert await read_frame(stream) is None
+
+
+async def test_read_frame_truncated():
+    """Test reading a frame cut off before its declared length."""
+    stream = anyio.wrap_file(io.BytesIO(encode_frame({"a": 1})[:-1]))
+
+    assert await read_frame(stream) is None
+
+
+async def test_msgpack_stdio_server_roundtrip():
+    """Test receiving and sending JSON-RPC messages as MessagePack frames."""
+    request = {"jsonrpc": "2.0", "id": 1, "method": "ping"}
+    stdin = anyio.wrap_file(io.BytesIO(encode_frame(request) + encode_frame({"bad": "message"})))
+    output = io.BytesIO()
+    stdout = anyio.wrap_file(output)
+
+    async with msgpack_stdio_server(stdin, stdout) as (read_stream, write_stream):
+        async with read_stream:
+            received = await read_stream.receive()
+            invalid = await read_stream.receive()
+
+        response = types.JSONRPCMessage(types.JSONRPCResponse(jsonrpc="2.0", id=1, result={}))
+        async with write_stream:
+            await write_stream.send(SessionMessage(response))
+
+    assert received.message.root.method == "ping"
+    assert isinstance(invalid, Exception)
+
+    frame = output.getvalue()
+    assert msgspec.msgpack.decode(frame[4:]) == {"jsonrpc": "2.0", "id": 1, "result": {}}
@@ -0,0 +1,17 @@
+"""Shared assertion helpers for NBP MCP Server tests."""
+
+
+def assert_all_in(haystack: str, *needles: str) -> None:
+    """Assert that every needle occurs in haystack, reporting all missing ones."""
+    missing = [needle for needle in needles if needle not in haystack]
+    assert not missing, f"Missing from result: {missing}"
+
+
+def async_return(value):
+    """Return a coroutine function that ignores its arguments and returns value.
+
+    Cheaper than AsyncMock for stand-ins whose calls are never inspected.
+    """
+    async def _return(*args, **kwargs):
+        return value
+    return _return